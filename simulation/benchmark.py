@@ -0,0 +1,103 @@
+"""Benchmarks of the simulation engine.
+
+Usage:
+  python -m simulation.benchmark --benchmarks=cold_start,repl
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from absl import app
+from absl import flags
+
+FLAGS = flags.FLAGS
+
+flags.DEFINE_list('benchmarks', ['cold_start', 'repl'], 'Benchmarks to run.')
+flags.DEFINE_integer('n_repeats', 10, 'Number of timed runs per benchmark.')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Small board, so that the query itself doesn't dominate the startup time.
+QUERY_FLAGS = ['--n_spaces=6', '--n_camels=3']
+QUERY = {'camel_states': [[1, 2], [2, 1], [3, 1]], 'camels_not_moved': [2, 3]}
+
+
+def _time_process(args, stdin=None):
+  start = time.perf_counter()
+  subprocess.run([sys.executable] + args, cwd=ROOT, input=stdin, check=True,
+                 capture_output=True, text=True)
+  return time.perf_counter() - start
+
+
+def _report(name, seconds):
+  print(f'{name}: median {statistics.median(seconds) * 1000:.1f}ms, '
+        f'min {min(seconds) * 1000:.1f}ms over {len(seconds)} runs')
+
+
+def _imported_modules(args):
+  """Top-level modules imported by a python process, from -X importtime."""
+  stderr = subprocess.run(
+      [sys.executable, '-X', 'importtime'] + args, cwd=ROOT, check=True,
+      capture_output=True, text=True).stderr
+  return {line.split('|')[-1].strip().split('.')[0]
+          for line in stderr.splitlines() if line.startswith('import time:')}
+
+
+def cold_start(n_repeats):
+  """Times fresh interpreters importing the engine and running the CLI.
+
+  Raises:
+    RuntimeError: if a single CLI query loads numpy.
+  """
+  modules = subprocess.run(
+      [sys.executable, '-c',
+       'import sys; from simulation import board; '
+       'print(",".join(m for m in ("numpy", "absl") if m in sys.modules))'],
+      cwd=ROOT, check=True, capture_output=True, text=True).stdout.strip()
+  print(f'Heavy modules loaded by the rules engine: {modules or "none"}')
+  if 'numpy' in _imported_modules(
+      ['-m', 'simulation.simulate_game_round_exhaustive'] + QUERY_FLAGS
+      + ['--initial_state=' + json.dumps(QUERY)]):
+    raise RuntimeError('A single CLI query loads numpy.')
+
+  _report('python startup', [
+      _time_process(['-c', 'pass']) for _ in range(n_repeats)])
+  _report('import rules engine', [
+      _time_process(['-c', 'from simulation import board'])
+      for _ in range(n_repeats)])
+  _report('single CLI query', [
+      _time_process(['-m', 'simulation.simulate_game_round_exhaustive']
+                    + QUERY_FLAGS + ['--initial_state=' + json.dumps(QUERY)])
+      for _ in range(n_repeats)])
+
+
+def repl(n_repeats):
+  """Times repeated queries answered by one --repl process."""
+  args = ['-m', 'simulation.simulate_game_round_exhaustive', '--repl'] + (
+      QUERY_FLAGS)
+  empty = statistics.median(
+      _time_process(args, stdin='') for _ in range(n_repeats))
+  n_queries = 1000
+  queries = ''.join(json.dumps(QUERY) + '\n' for _ in range(n_queries))
+  total = _time_process(args, stdin=queries)
+  print(f'repl: startup {empty * 1000:.1f}ms, '
+        f'{(total - empty) / n_queries * 1e6:.0f}us per query '
+        f'over {n_queries} queries')
+
+
+BENCHMARKS = {
+    'cold_start': cold_start,
+    'repl': repl,
+}
+
+
+def main(_):
+  for name in FLAGS.benchmarks:
+    BENCHMARKS[name](FLAGS.n_repeats)
+
+
+if __name__ == '__main__':
+  app.run(main)
@@ -8,22 +8,22 @@ Conventions:
   - special space n_spaces+1 in finish zone
 
 """
-from dataclasses import dataclass
-
-import numpy as np
+import random
 
 from simulation import game_round
+from simulation import moves
 
-@dataclass
-class CamelState:
-  camel_id: int
-  position: int
+# Moves live in `moves` so that `game_round` doesn't need to import `board`.
+CamelState = moves.CamelState
+TileState = moves.TileState
+LegBetState = moves.LegBetState
+GameBetState = moves.GameBetState
 
-@dataclass
-class TileState:
-  player_id: int
-  plus: bool
-  position: None
+STARTING_COINS = 3
+# Payouts for the 1st, 2nd, ... leg bet taken on a camel in a round.
+LEG_BET_VALUES = (5, 3, 2)
+# Payouts for the 1st, 2nd, ... correct game bet. Later ones get the last value.
+GAME_BET_VALUES = (8, 5, 3, 2, 1)
 
 class TrackState:
   def __init__(self, n_spaces=16, n_camels=5, n_players=2):
@@ -42,6 +42,25 @@ class TrackState:
   def camel_standings(self):
     return [c.camel_id for c in self.camel_states]
 
+  def is_legal_state(self):
+    # Rule #1: each camel must be in exact one position.
+    camel_ids = sorted(c.camel_id for c in self.camel_states)
+    if camel_ids != list(range(1, self.n_camels + 1)):
+      return False, f'Camels {camel_ids} are not exactly [1, {self.n_camels}].'
+
+    # Rule #2: positions must be in [0, n_spaces+1].
+    for c in self.camel_states:
+      if not 0 <= c.position <= self.n_spaces + 1:
+        return False, f'Camel {c.camel_id} is at invalid position {c.position}.'
+
+    # Rule #3: camels must be sorted from first to last position, so that camels
+    # in the same stack are contiguous.
+    for i in range(len(self.camel_states) - 1):
+      if self.camel_states[i].position < self.camel_states[i+1].position:
+        return False, 'Camels not sorted by position.'
+
+    return True, 'Legal'
+
   def apply_move(self, move):
     if self.is_end_of_game():
       raise ValueError('Game has already ended.')
@@ -89,147 +108,38 @@ class TrackState:
     # Check if first camel is in the ending zone.
     return self.camel_states[0].position > self.n_spaces
 
-  def render_to_array(self):
-    a = np.zeros((self.n_camels, self.n_spaces+2), dtype=np.int)
-    for i, camel in enumerate(self.camel_states):
-      row = self.n_camels - 1
-      while a[row, camel.position] != 0:
-        row -= 1
-      a[row, camel.position] = camel.camel_id
-
-      if i == len(self.camel_states) - 1 or self.camel_states[i+1].position != camel.position:
-        a[row:self.n_camels, camel.position] = a[row:self.n_camels, camel.position][::-1]
-    return a
-
-  def print(self):
-    print(self.render_to_array())
-
-
-TRACK_START_ROW = 2
-TRACK_START_COL = 1
-
-class Tracks:
-  def __init__(self, n_spaces=16, n_camels=5):
-    self.n_spaces = n_spaces
-    self.n_camels = n_camels
-
-    # minus_one
-    # plus_one
-    # track_5
-    # track_4
-    # ...
-    # track_1
-    self.features = [
-        'minus_one',
-        'plus_one',
-    ] + [
-        f'track_{i}' for i in range(n_camels, 0, -1)
-    ]
-
-    # state is [features, position].
-    # Special positions:
-    #  - state[:, 0] is before the track (camels that haven't moved yet)
-    #  - state[:, -1] is after the track (camels that won)
-    self.state = np.zeros((len(self.features), (n_spaces + 2)))
-
-    # state[:, 0] is special:
-    #  - All camels start here at the beginning of the game.
-    #  - Camels don't obey the stacked move behavior here.
-    for i in range(1, n_camels + 1):
-      self.state[-i, 0] = i
-
-  def is_end_of_game(self):
-    return np.any(self.state[-self.n_camels:, -1] > 0)
-
-  def is_legal_state(self):
-    # Check plus/minus tiles.
-    # Rule #1: tiles must be in the main track (not before/after).
-    if np.any(self.state[:2, 0]):
-      return False, 'Plus/Minus in starting zone.'
-    if np.any(self.state[:2, -1]):
-      return False, 'Plus/Minus in finish zone.'
-
-    # Rule #2: each tile may have only either plus or minus.
-    mask_0 = (self.state[0, :] != 0)
-    mask_1 = (self.state[1, :] != 0)
-    if np.any(mask_0 & mask_1):
-      return False, 'Same tile has both plus and minus.'
-
-    # Rule #3: adjacent tiles cannot have plus/minus.
-    mask_01 = mask_0 | mask_1
-    for i in range(len(mask_01) - 1):
-      if mask_01[i] and mask_01[i+1]:
-        return False, 'Adjacent tiles have plus/minus.'
-
-    # Check camels.
-    # Rule #1: each camel must be in exact one position.
-    for camel in range(1, self.n_camels + 1):
-      camel_mask = self.state[-self.n_camels:, :] == camel
-      n_camel_pos = np.sum(camel_mask)
-      if n_camel_pos != 1:
-        return False, f'Camel {camel} is in {n_camel_pos} positions.'
-
-    # Rule #2: camels must be stacked from the bottom track upwards.
-    for track in range(1, self.n_camels):
-      track_mask = self.state[-track, 1:] != 0
-      above_tracks_mask = np.sum(self.state[2:-track, 1:], axis=0) != 0
-      if np.any((1 - track_mask) & above_tracks_mask):
-        return False, 'Camels not stacked from bottom track upwards.'
-
-    # Rule #3: no camel can be on a tile with plus/minus.
-    camels_mask = self.state[-self.n_camels:, :] != 0
-    if np.any(camels_mask & mask_01):
-      return False, 'Camels cannot be on a tile with plus/minus.'
-
-    return True, 'Legal'
-
-  def apply_move(self, move):
-    if self.is_end_of_game():
-      raise ValueError('Game has already ended.')
-
-    start_rows, start_col = self._find_all_camels_to_move(move.camel_id)
-    end_col = start_col + move.spaces
-    if end_col >= self.max_col:
-      end_col = self.max_col - 1
-
-    end_row = -1
-    while self.state[end_row, end_col] != 0:
-      end_row -= 1
-    end_rows = list(range(end_row, end_row-len(start_rows), -1))
-
-    self.state[end_rows, end_col] = self.state[start_rows, start_col]
-    self.state[start_rows, start_col] = 0
-    
-    
-
-  def _find_all_camels_to_move(self, camel):
-    start_row, start_col = self._find_camel(camel)
-    if start_col == 0:
-      return [start_row], start_col
-    rows = []
-    while start_row >= TRACK_START_ROW and self.state[start_row, start_col] != 0:
-      rows.append(start_row)
-      start_row -= 1
-    return rows, start_col
-
-  def _find_camel(self, camel):
-    idxs = np.argwhere(self.state == camel)
-    idxs = [idx for idx in idxs if idx[0] >= TRACK_START_ROW]  # skip non-tracks.
-    assert len(idxs) == 1  # camel should only be at 1 place
-    return idxs[0]
+  def render_to_grid(self):
+    """[track][position] camel ids as nested lists, 0 where empty.
 
+    Stacks are drawn from the bottom track upwards.
+    """
+    grid = [[0] * (self.n_spaces + 2) for _ in range(self.n_camels)]
+    stacks = {}
+    for camel in self.camel_states:
+      stacks.setdefault(camel.position, []).append(camel.camel_id)
+    for position, stack in stacks.items():
+      for row, camel_id in enumerate(stack, self.n_camels - len(stack)):
+        grid[row][position] = camel_id
+    return grid
 
-  @property
-  def max_col(self):
-    return len(self.state[0])
+  def render_to_array(self):
+    import numpy as np  # Only needed for rendering, keep it off the import path.
+    return np.array(self.render_to_grid(), dtype=int)
 
-  @property
-  def max_row(self):
-    return len(self.state)
+  def print(self):
+    # Plain text rather than `render_to_array`, so that printing doesn't load
+    # numpy.
+    width = len(str(self.n_camels))
+    for row in self.render_to_grid():
+      print(' '.join(str(c if c else '.').rjust(width) for c in row))
 
 
-  def print(self):
-    print(self.state)
+def __getattr__(name):
+  # The numpy-backed `Tracks` is loaded on first use, e.g. `board.Tracks`.
+  if name in ('Tracks', 'TRACK_START_ROW', 'TRACK_START_COL'):
+    from simulation import tracks
+    return getattr(tracks, name)
+  raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 
 class Board:
@@ -243,18 +153,127 @@ class Board:
     self.tracks = TrackState(n_spaces, n_camels, n_players)
     self.round = game_round.GameRound(self.tracks)
 
-  def step_randomly(self):
+    self.coins = [STARTING_COINS] * n_players
+    # camel_id -> values of the leg bet tiles still available this round.
+    self.leg_bet_tiles = {
+        camel_id: list(LEG_BET_VALUES) for camel_id in range(1, n_camels+1)}
+    # List of (LegBetState, value) taken this round.
+    self.leg_bets = []
+    # List of GameBetState, in the order they were placed.
+    self.game_bets = []
+
+  def step_randomly(self, rng=random, player_id=None):
+    """Rolls the dice with `rng` and applies the camel move.
+
+    Starts a new round first if the previous one ended. Returns the move.
+    """
     if self.round.is_end_of_round():
       self.round.start_new_round()
 
-    move = self.round.get_camel_move()
-    print(move)
-    self.apply_move(move)
+    move = self.round.get_camel_move(rng=rng)
+    self.apply_move(move, player_id)
+    return move
+
+  def apply_move(self, move, player_id=None):
+    """Applies a move, optionally made by `player_id`.
+
+    Camel moves made by a player earn them a coin. Leg bets are paid out when
+    the round or the game ends, game bets when the game ends. Tiles are only
+    placed: they don't move camels or pay out yet.
+    """
+    if isinstance(move, TileState) and not self.can_place_tile(
+        move.player_id, move.position):
+      raise ValueError(f'Player {move.player_id} can not place a tile on '
+                       f'space {move.position}.')
+    if isinstance(move, LegBetState):
+      return self._apply_leg_bet(move)
+    if isinstance(move, GameBetState):
+      return self._apply_game_bet(move)
 
-  def apply_move(self, move):
-    self.round.apply_move(move)
+    if isinstance(move, CamelState):
+      self.round.apply_move(move)
     self.tracks.apply_move(move)
 
+    if isinstance(move, CamelState):
+      if player_id is not None:
+        self.coins[player_id] += 1
+      if self.round.is_end_of_round() or self.tracks.is_end_of_game():
+        self._settle_leg_bets()
+      if self.tracks.is_end_of_game():
+        self._settle_game_bets()
+
+  def available_leg_bet(self, camel_id):
+    """Value of the next leg bet on `camel_id`, or None if none are left."""
+    tiles = self.leg_bet_tiles[camel_id]
+    return tiles[0] if tiles else None
+
+  def can_game_bet(self, player_id, camel_id):
+    # Each player has a single card per camel for both winner and loser bets.
+    return not any(bet.player_id == player_id and bet.camel_id == camel_id
+                   for bet in self.game_bets)
+
+  def can_place_tile(self, player_id, position):
+    """Whether `player_id` may (re)place their tile on `position`.
+
+    Tiles go on an empty space of the track, not on or next to another
+    player's tile. The player's own tile is picked up first, so it doesn't
+    block.
+    """
+    if not 1 <= position <= self.n_spaces:
+      return False
+    if any(c.position == position for c in self.tracks.camel_states):
+      return False
+    return not any(
+        tile.player_id != player_id and tile.position is not None
+        and abs(tile.position - position) <= 1
+        for tile in self.tracks.player_tiles)
+
+  def _apply_leg_bet(self, bet):
+    if self.tracks.is_end_of_game():
+      raise ValueError('Game has already ended.')
+    value = self.available_leg_bet(bet.camel_id)
+    if value is None:
+      raise ValueError(f'No leg bets left on camel {bet.camel_id}.')
+    self.leg_bet_tiles[bet.camel_id].pop(0)
+    self.leg_bets.append((bet, value))
+
+  def _apply_game_bet(self, bet):
+    if self.tracks.is_end_of_game():
+      raise ValueError('Game has already ended.')
+    if not self.can_game_bet(bet.player_id, bet.camel_id):
+      raise ValueError(
+          f'Player {bet.player_id} already bet on camel {bet.camel_id}.')
+    self.game_bets.append(bet)
+
+  def _pay(self, player_id, amount):
+    self.coins[player_id] = max(self.coins[player_id] + amount, 0)
+
+  def _settle_leg_bets(self):
+    standings = self.tracks.camel_standings()
+    for bet, value in self.leg_bets:
+      if bet.camel_id == standings[0]:
+        self._pay(bet.player_id, value)
+      elif bet.camel_id == standings[1]:
+        self._pay(bet.player_id, 1)
+      else:
+        self._pay(bet.player_id, -1)
+    self.leg_bets = []
+    for tiles in self.leg_bet_tiles.values():
+      tiles[:] = LEG_BET_VALUES
+
+  def _settle_game_bets(self):
+    standings = self.tracks.camel_standings()
+    for winner, camel_id in ((True, standings[0]), (False, standings[-1])):
+      n_correct = 0
+      for bet in self.game_bets:
+        if bet.winner != winner:
+          continue
+        if bet.camel_id == camel_id:
+          self._pay(bet.player_id, GAME_BET_VALUES[
+              min(n_correct, len(GAME_BET_VALUES) - 1)])
+          n_correct += 1
+        else:
+          self._pay(bet.player_id, -1)
+
   def print(self):
     self.tracks.print()
-
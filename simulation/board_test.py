@@ -1,5 +1,10 @@
 """Tests for simulation.board."""
 
+import contextlib
+import io
+import os
+import subprocess
+import sys
 import unittest
 
 import numpy as np
@@ -323,5 +328,118 @@ class TracksTest(unittest.TestCase):
       t.apply_move(moves.CamelMove(*move))
     np.testing.assert_array_equal(t.state, end_state)
 
+  @parameterized.expand([
+    ([(1, 2)], [1, 3, 2]),
+    ([(3, 1), (2, 1), (1, 3)], [1, 2, 3]),
+    ([(1, 3)], [1, 3, 2]),
+  ])
+  def test_camel_standings(self, moves_list, standings):
+    t = board.Tracks(n_spaces=3, n_camels=3)
+    for move in moves_list:
+      t.apply_move(moves.CamelMove(*move))
+    self.assertEqual(t.camel_standings(), standings)
+
+
+class TrackStateTest(unittest.TestCase):
+  @parameterized.expand([
+    ([(1, 3), (2, 3), (3, 1)], True),
+    ([(1, 3), (2, 3), (3, 0)], True),
+    ([(1, 7), (2, 3), (3, 1)], False),
+    ([(1, 3), (2, 1), (3, 3)], False),
+    ([(1, 3), (1, 3), (3, 1)], False),
+    ([(1, 3), (2, 3)], False),
+  ])
+  def test_is_legal_state(self, camel_states, is_legal):
+    t = board.TrackState(n_spaces=4, n_camels=3)
+    t.camel_states = [board.CamelState(*c) for c in camel_states]
+    legal, reason = t.is_legal_state()
+    self.assertEqual(is_legal, legal, msg=reason)
+
+  def test_render_to_array(self):
+    t = board.TrackState(n_spaces=3, n_camels=3)
+    for camel_state in [board.CamelState(2, 1), board.CamelState(3, 1),
+                        board.CamelState(1, 2)]:
+      t.apply_move(camel_state)
+    np.testing.assert_array_equal(t.render_to_array(),
+        [
+          [0, 0, 0, 0, 0],
+          [0, 3, 0, 0, 0],
+          [0, 2, 1, 0, 0],
+        ])
+
+  def test_print(self):
+    t = board.TrackState(n_spaces=3, n_camels=3)
+    for camel_state in [board.CamelState(2, 1), board.CamelState(3, 1),
+                        board.CamelState(1, 2)]:
+      t.apply_move(camel_state)
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+      t.print()
+    self.assertEqual(out.getvalue(), '. . . . .\n. 3 . . .\n. 2 1 . .\n')
+
+
+class BoardTest(unittest.TestCase):
+  def test_leg_bets_settled_at_end_of_round(self):
+    b = board.Board(n_spaces=16, n_camels=3, n_players=2)
+    b.apply_move(board.LegBetState(0, 1), 0)
+    b.apply_move(board.LegBetState(1, 1), 1)
+    b.apply_move(board.LegBetState(1, 2), 1)
+    b.apply_move(board.CamelState(1, 3), 0)
+    b.apply_move(board.CamelState(2, 2), 1)
+    self.assertEqual(b.coins, [4, 4])
+    b.apply_move(board.CamelState(3, 1), 0)
+    # Camel 1 first: +5 to player 0, +3 to player 1. Camel 2 second: +1.
+    self.assertEqual(b.coins, [10, 8])
+    self.assertEqual(b.available_leg_bet(1), 5)
+    self.assertEqual(b.leg_bets, [])
+
+  def test_game_bets_settled_at_end_of_game(self):
+    b = board.Board(n_spaces=2, n_camels=2, n_players=2)
+    b.apply_move(board.GameBetState(0, 1, True), 0)
+    b.apply_move(board.GameBetState(1, 1, True), 1)
+    b.apply_move(board.GameBetState(1, 2, False), 1)
+    with self.assertRaises(ValueError):
+      b.apply_move(board.GameBetState(1, 2, True), 1)
+    b.apply_move(board.CamelState(1, 3))
+    # Camel 1 wins, camel 2 (still in the starting zone) loses.
+    self.assertEqual(b.coins, [3 + 8, 3 + 5 + 8])
+
+  def test_tile_placement(self):
+    b = board.Board(n_spaces=8, n_camels=2, n_players=2)
+    b.apply_move(board.CamelState(1, 2))
+    b.apply_move(board.TileState(0, True, 5), 0)
+    self.assertFalse(b.can_place_tile(1, 0))
+    self.assertFalse(b.can_place_tile(1, 9))
+    self.assertFalse(b.can_place_tile(1, 2))  # Camel.
+    for position in (4, 5, 6):
+      self.assertFalse(b.can_place_tile(1, position))
+    self.assertTrue(b.can_place_tile(1, 7))
+    # A player's own tile doesn't block moving it.
+    self.assertTrue(b.can_place_tile(0, 6))
+    with self.assertRaises(ValueError):
+      b.apply_move(board.TileState(1, False, 4), 1)
+    b.apply_move(board.TileState(1, False, 7), 1)
+    self.assertEqual([t.position for t in b.tracks.player_tiles], [5, 7])
+
 
+class ImportTest(unittest.TestCase):
+  def test_rules_engine_does_not_import_numpy(self):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    loaded = subprocess.run(
+        [sys.executable, '-c',
+         'import sys; from simulation import board, game_round; '
+         'board.Board().apply_move(board.CamelState(1, 2)); '
+         'print("numpy" in sys.modules)'],
+        cwd=root, check=True, capture_output=True, text=True).stdout.strip()
+    self.assertEqual(loaded, 'False')
 
+  def test_single_cli_query_does_not_import_numpy(self):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    loaded = subprocess.run(
+        [sys.executable, '-c',
+         'import sys; from absl import flags; '
+         'from simulation import simulate_game_round_exhaustive as cli; '
+         'flags.FLAGS(["cli", "--n_spaces=6", "--n_camels=3"]); cli.main([]); '
+         'print("numpy" in sys.modules)'],
+        cwd=root, check=True, capture_output=True, text=True).stdout
+    self.assertEqual(loaded.splitlines()[-1], 'False')
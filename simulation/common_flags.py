@@ -0,0 +1,38 @@
+"""Flags shared by some of the simulation binaries.
+
+absl flags live in one global registry, so a flag defined by two modules can't
+be imported into the same process. Binaries call the definers for the shared
+flags they use, at module level, and define their own flags themselves. Each
+definer is a no-op if its flags already exist.
+"""
+from absl import flags
+
+FLAGS = flags.FLAGS
+
+
+def _define(define, name, default, help_string):
+  if name not in FLAGS:
+    define(name, default, help_string)
+
+
+def define_board_flags():
+  _define(flags.DEFINE_integer, 'n_spaces', 16,
+          'Number of spaces in the race track.')
+  _define(flags.DEFINE_integer, 'n_camels', 5,
+          'Number of camels in the race track.')
+
+
+def define_game_odds_flag():
+  _define(flags.DEFINE_bool, 'game_odds', False,
+          'Also compute exact end of game probabilities. Only supported on '
+          'boards with at most 3 camels, or 4 camels on at most 12 spaces.')
+
+
+def define_seed_flag():
+  _define(flags.DEFINE_integer, 'seed', 0,
+          'Seed of the first game or sequence.')
+
+
+def define_n_workers_flag():
+  _define(flags.DEFINE_integer, 'n_workers', 0,
+          'Worker processes. 0 means cpu count.')
@@ -0,0 +1,272 @@
+"""Randomized differential testing of the track backends.
+
+Plays seeded random move sequences through every backend in `BACKENDS`,
+checking the invariants after every step and that all backends agree. Failing
+sequences are shrunk to a minimal reproducer.
+
+Usage:
+  python -m simulation.fuzz --n_sequences=1000000 --max_seconds=300
+"""
+import multiprocessing
+import os
+import time
+
+from absl import app
+from absl import flags
+import numpy as np
+
+from simulation import board
+from simulation import common_flags
+from simulation import game_solver
+from simulation import moves
+from simulation import tracks
+
+FLAGS = flags.FLAGS
+
+common_flags.define_board_flags()
+common_flags.define_seed_flag()
+common_flags.define_n_workers_flag()
+flags.DEFINE_integer('n_max_roll', 3, 'Maximum roll of the dice.')
+flags.DEFINE_integer('n_sequences', 100000, 'Number of sequences to play.')
+flags.DEFINE_integer('max_moves', 100, 'Maximum number of moves per sequence.')
+flags.DEFINE_float('max_seconds', 0, 'Time budget. 0 means no limit.')
+
+
+class TrackStateBackend:
+  def __init__(self, n_spaces, n_camels):
+    self.tracks = board.TrackState(n_spaces, n_camels)
+
+  def apply_move(self, camel_id, roll):
+    camel = self.tracks.find_camel(camel_id)
+    self.tracks.apply_move(board.CamelState(camel_id, camel.position + roll))
+
+  def is_legal_state(self):
+    legal, reason = self.tracks.is_legal_state()
+    if not legal:
+      return legal, reason
+    return check_rendered_array(
+        self.tracks.render_to_array(), self.tracks.camel_standings())
+
+  def is_end_of_game(self):
+    return self.tracks.is_end_of_game()
+
+  def camel_positions(self):
+    return {c.camel_id: c.position for c in self.tracks.camel_states}
+
+  def camel_standings(self):
+    return self.tracks.camel_standings()
+
+
+class TracksBackend:
+  def __init__(self, n_spaces, n_camels):
+    self.tracks = tracks.Tracks(n_spaces, n_camels)
+
+  def apply_move(self, camel_id, roll):
+    self.tracks.apply_move(moves.CamelMove(camel_id, roll))
+
+  def is_legal_state(self):
+    return self.tracks.is_legal_state()
+
+  def is_end_of_game(self):
+    return self.tracks.is_end_of_game()
+
+  def camel_positions(self):
+    return self.tracks.camel_positions()
+
+  def camel_standings(self):
+    return self.tracks.camel_standings()
+
+
+class GeometryBackend:
+  """`game_solver.move_camel` on the solver's geometry tuples."""
+
+  def __init__(self, n_spaces, n_camels):
+    self.n_spaces = n_spaces
+    self.n_camels = n_camels
+    self.geometry = game_solver.to_geometry(
+        board.TrackState(n_spaces, n_camels))
+
+  def apply_move(self, camel_id, roll):
+    self.geometry = game_solver.move_camel(
+        self.geometry, camel_id, roll, self.n_spaces)
+
+  def is_legal_state(self):
+    tracks = board.TrackState(self.n_spaces, self.n_camels)
+    tracks.camel_states = [board.CamelState(camel_id, position)
+                           for camel_id, position in self.geometry]
+    return tracks.is_legal_state()
+
+  def is_end_of_game(self):
+    return self.geometry[0][1] > self.n_spaces
+
+  def camel_positions(self):
+    return dict(self.geometry)
+
+  def camel_standings(self):
+    return [camel_id for camel_id, _ in self.geometry]
+
+
+BACKENDS = {
+    'track_state': TrackStateBackend,
+    'tracks': TracksBackend,
+    'geometry': GeometryBackend,
+}
+
+
+def check_rendered_array(a, standings):
+  """Checks a rendered [track, position] array against the standings."""
+  n_camels = a.shape[0]
+  camel_ids = sorted(a[a != 0].tolist())
+  if camel_ids != list(range(1, n_camels + 1)):
+    return False, f'Rendered camels {camel_ids} are not exactly [1, {n_camels}].'
+
+  occupied = a[::-1, :] != 0
+  if np.any(~occupied[:-1] & occupied[1:]):
+    return False, 'Rendered camels not stacked from bottom track upwards.'
+
+  # The starting zone has no stacking order, so only compare its contents.
+  by_position = a[:, :0:-1].T
+  rendered = by_position[by_position != 0].tolist()
+  start_zone = set(a[:, 0].tolist())
+  on_track = [c for c in standings if c not in start_zone]
+  if rendered != on_track:
+    return False, f'Rendered standings {rendered} != standings {on_track}.'
+  return True, 'Legal'
+
+
+def random_sequence(seed, n_camels, n_max_roll, max_moves):
+  """Returns a list of (camel_id, roll) drawn from the given seed."""
+  rng = np.random.RandomState(seed)
+  camel_ids = rng.randint(1, n_camels + 1, size=max_moves)
+  rolls = rng.randint(1, n_max_roll + 1, size=max_moves)
+  return list(zip(camel_ids.tolist(), rolls.tolist()))
+
+
+def run_sequence(sequence, n_spaces, n_camels, backends=None):
+  """Plays the sequence through all backends.
+
+  Returns:
+    None if all invariants held, otherwise a description of the failure. Moves
+    after the end of the game are ignored.
+  """
+  backends = backends or BACKENDS
+  states = {name: backend(n_spaces, n_camels)
+            for name, backend in backends.items()}
+  for step, (camel_id, roll) in enumerate(sequence):
+    for name, state in states.items():
+      try:
+        state.apply_move(camel_id, roll)
+        legal, reason = state.is_legal_state()
+      except Exception as e:  # pylint: disable=broad-except
+        legal, reason = False, f'{type(e).__name__}: {e}'
+      if not legal:
+        return f'step {step}, backend {name}: {reason}'
+
+    (ref_name, ref), *others = states.items()
+    ref_positions = ref.camel_positions()
+    # The starting zone has no stacking order, so compare only moved camels.
+    ref_standings = [c for c in ref.camel_standings() if ref_positions[c]]
+    for name, state in others:
+      positions = state.camel_positions()
+      if positions != ref_positions:
+        return (f'step {step}: positions of {name} {positions} '
+                f'!= {ref_name} {ref_positions}')
+      if state.is_end_of_game() != ref.is_end_of_game():
+        return f'step {step}: end of game differs between {name} and {ref_name}'
+      standings = [c for c in state.camel_standings() if positions[c]]
+      if standings != ref_standings:
+        return (f'step {step}: standings of {name} {standings} '
+                f'!= {ref_name} {ref_standings}')
+
+    if ref.is_end_of_game():
+      break
+  return None
+
+
+def shrink(sequence, fails):
+  """Shrinks a failing sequence to a minimal one for which `fails` holds.
+
+  Greedily removes chunks of moves (halving the chunk size down to single
+  moves), then lowers the rolls.
+  """
+  chunk = max(len(sequence) // 2, 1)
+  while True:
+    i = 0
+    while i < len(sequence):
+      candidate = sequence[:i] + sequence[i+chunk:]
+      if candidate and fails(candidate):
+        sequence = candidate
+      else:
+        i += chunk
+    if chunk == 1:
+      break
+    chunk //= 2
+
+  for i, (camel_id, roll) in enumerate(sequence):
+    for smaller_roll in range(1, roll):
+      candidate = sequence[:i] + [(camel_id, smaller_roll)] + sequence[i+1:]
+      if fails(candidate):
+        sequence = candidate
+        break
+  return sequence
+
+
+def fuzz(seeds, n_spaces, n_camels, n_max_roll, max_moves, deadline=None):
+  """Runs one sequence per seed.
+
+  Returns:
+    (n_run, failures), with failures a list of
+    (seed, minimal sequence, failure description).
+  """
+  def fails(sequence):
+    return run_sequence(sequence, n_spaces, n_camels) is not None
+
+  failures = []
+  n_run = 0
+  for seed in seeds:
+    if deadline is not None and time.time() > deadline:
+      break
+    sequence = random_sequence(seed, n_camels, n_max_roll, max_moves)
+    n_run += 1
+    if fails(sequence):
+      sequence = shrink(sequence, fails)
+      failures.append(
+          (seed, sequence, run_sequence(sequence, n_spaces, n_camels)))
+  return n_run, failures
+
+
+def _fuzz_chunk(args):
+  return fuzz(*args)
+
+
+def main(_):
+  n_workers = FLAGS.n_workers or os.cpu_count()
+  deadline = time.time() + FLAGS.max_seconds if FLAGS.max_seconds else None
+  chunk_size = 1000
+  chunks = [
+      (range(start, min(start + chunk_size, FLAGS.seed + FLAGS.n_sequences)),
+       FLAGS.n_spaces, FLAGS.n_camels, FLAGS.n_max_roll, FLAGS.max_moves,
+       deadline)
+      for start in range(FLAGS.seed, FLAGS.seed + FLAGS.n_sequences, chunk_size)
+  ]
+
+  start_time = time.time()
+  n_run = 0
+  failures = []
+  with multiprocessing.Pool(n_workers) as pool:
+    for chunk_run, chunk_failures in pool.imap_unordered(_fuzz_chunk, chunks):
+      n_run += chunk_run
+      failures.extend(chunk_failures)
+  elapsed = time.time() - start_time
+
+  print(f'Ran {n_run} sequences in {elapsed:.1f}s with {n_workers} workers '
+        f'({n_run / elapsed:.0f} sequences/s).')
+  for seed, sequence, reason in sorted(failures):
+    print(f'FAILED seed={seed}: {reason}')
+    print(f'  minimal sequence (camel_id, roll): {sequence}')
+  if failures:
+    raise SystemExit(1)
+
+
+if __name__ == '__main__':
+  app.run(main)
@@ -0,0 +1,73 @@
+"""Tests for simulation.fuzz."""
+
+import unittest
+
+import numpy as np
+from parameterized import parameterized
+
+from simulation import fuzz
+
+
+class ShortRollTracksBackend(fuzz.TracksBackend):
+  """Buggy backend that never moves a camel by more than 2 spaces."""
+
+  def apply_move(self, camel_id, roll):
+    super().apply_move(camel_id, min(roll, 2))
+
+
+class FuzzTest(unittest.TestCase):
+  @parameterized.expand([
+    (4, 2),
+    (6, 3),
+    (16, 5),
+  ])
+  def test_backends_agree(self, n_spaces, n_camels):
+    n_run, failures = fuzz.fuzz(
+        range(200), n_spaces, n_camels, n_max_roll=3, max_moves=50)
+    self.assertEqual(n_run, 200)
+    self.assertEqual(failures, [])
+
+  def test_detects_and_shrinks_buggy_backend(self):
+    backends = dict(fuzz.BACKENDS, buggy=ShortRollTracksBackend)
+
+    def fails(sequence):
+      return fuzz.run_sequence(sequence, 16, 5, backends) is not None
+
+    sequence = fuzz.random_sequence(0, n_camels=5, n_max_roll=3, max_moves=50)
+    self.assertTrue(fails(sequence))
+    minimal = fuzz.shrink(sequence, fails)
+    self.assertEqual(len(minimal), 1)
+    self.assertEqual(minimal[0][1], 3)
+
+  def test_shrink(self):
+    def fails(sequence):
+      moved = {camel_id for camel_id, _ in sequence}
+      return {2, 3} <= moved
+    sequence = fuzz.random_sequence(0, n_camels=5, n_max_roll=3, max_moves=30)
+    self.assertTrue(fails(sequence))
+    self.assertEqual(sorted(fuzz.shrink(sequence, fails)), [(2, 1), (3, 1)])
+
+  @parameterized.expand([
+    ([[0, 0, 0, 0, 0],
+      [0, 0, 0, 0, 0],
+      [3, 0, 0, 0, 0]], [1, 2, 3], False),
+    ([[0, 0, 0, 0, 0],
+      [0, 0, 2, 0, 0],
+      [3, 0, 0, 1, 0]], [1, 2, 3], False),
+    ([[0, 0, 0, 0, 0],
+      [0, 0, 2, 0, 0],
+      [3, 0, 1, 0, 0]], [1, 2, 3], False),
+    ([[0, 0, 0, 0, 0],
+      [0, 0, 2, 0, 0],
+      [3, 0, 1, 0, 0]], [2, 1, 3], True),
+    ([[0, 0, 0, 0, 0],
+      [0, 0, 0, 0, 0],
+      [3, 2, 0, 1, 0]], [1, 2, 3], True),
+  ])
+  def test_check_rendered_array(self, a, standings, is_legal):
+    legal, reason = fuzz.check_rendered_array(np.array(a), standings)
+    self.assertEqual(is_legal, legal, msg=reason)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -1,6 +1,6 @@
-import numpy as np
+import random
 
-from simulation import board
+from simulation import moves
 
 
 class GameRound:
@@ -10,20 +10,21 @@ class GameRound:
     self.n_max_roll = n_max_roll
     self.start_new_round()
 
-  def get_camel_move(self, camel_id=None, roll=None):
+  def get_camel_move(self, camel_id=None, roll=None, rng=random):
+    """Draws the camel and/or roll that are not given from `rng`."""
     if camel_id is None:
-      camel_id = np.random.choice(self.camels_not_moved)
+      camel_id = rng.choice(self.camels_not_moved)
     camel = self.track_state.find_camel(camel_id)
     if roll is None:
-      roll = np.random.randint(1, self.n_max_roll+1)
-    return board.CamelState(camel_id, camel.position + roll)
+      roll = rng.randint(1, self.n_max_roll)
+    return moves.CamelState(camel_id, camel.position + roll)
 
   def get_all_camel_moves(self):
     all_moves = []
     for camel_id in self.camels_not_moved:
       camel = self.track_state.find_camel(camel_id)
       for roll in range(1, self.n_max_roll+1):
-        all_moves.append(board.CamelState(camel_id, camel.position + roll))
+        all_moves.append(moves.CamelState(camel_id, camel.position + roll))
     return all_moves
 
   def apply_move(self, move):
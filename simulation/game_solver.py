@@ -0,0 +1,214 @@
+"""Exact end-of-game odds via dynamic programming over round boundaries.
+
+At the start of every round all camels are eligible to move again, so the
+game state at a round boundary is fully described by the stack geometry: the
+tuple of (camel_id, position) pairs in `TrackState.camel_states` order. The
+solver computes, for each geometry, the distribution over next start-of-round
+geometries (memoized), and composes those transitions to get exact
+winner/loser probabilities for the whole game.
+"""
+import collections
+
+import numpy as np
+
+
+def game_odds_tractable(n_spaces, n_camels):
+  """Whether `GameSolver.game_end_probs` finishes in about a minute.
+
+  The solver visits every reachable start-of-round geometry, e.g. ~3.6k for
+  16x3 (seconds), ~27k for 12x4 (about a minute). 16x5 is out of reach.
+  """
+  return n_camels <= 3 or (n_camels == 4 and n_spaces <= 12)
+
+
+def to_geometry(track_state):
+  """Returns the hashable stack geometry of a `TrackState`."""
+  return tuple((c.camel_id, c.position) for c in track_state.camel_states)
+
+
+def move_camel(geometry, camel_id, roll, n_spaces):
+  """Same as `TrackState.apply_move`, directly on a geometry tuple."""
+  for idx, (c, position) in enumerate(geometry):
+    if c == camel_id:
+      break
+  else:
+    raise ValueError(f'Camel {camel_id} is not on the track.')
+  # The camel carries the camels stacked on top of it, except in the starting
+  # zone.
+  start = idx
+  if position != 0:
+    while start > 0 and geometry[start - 1][1] == position:
+      start -= 1
+  end = min(position + roll, n_spaces + 1)
+
+  # Moving camels land on top of the stack at `end`.
+  rest = geometry[:start] + geometry[idx + 1:]
+  insert = 0
+  while insert < len(rest) and rest[insert][1] > end:
+    insert += 1
+  moving = tuple((c, end) for c, _ in geometry[start:idx + 1])
+  return rest[:insert] + moving + rest[insert:]
+
+
+class LRUCache:
+  """Dict-like cache that evicts the least recently used entries."""
+
+  def __init__(self, maxsize):
+    self.maxsize = maxsize
+    self._data = collections.OrderedDict()
+
+  def __contains__(self, key):
+    return key in self._data
+
+  def __getitem__(self, key):
+    self._data.move_to_end(key)
+    return self._data[key]
+
+  def __setitem__(self, key, value):
+    self._data[key] = value
+    self._data.move_to_end(key)
+    if len(self._data) > self.maxsize:
+      self._data.popitem(last=False)
+
+  def __len__(self):
+    return len(self._data)
+
+
+class GameSolver:
+  def __init__(self, n_spaces=16, n_camels=5, n_max_roll=3,
+               transition_cache_size=1000, game_cache_size=100000,
+               round_start_cache_size=100000, mid_round_cache_size=1000):
+    self.n_spaces = n_spaces
+    self.n_camels = n_camels
+    self.n_max_roll = n_max_roll
+
+    # Start-of-round geometry -> {end_of_round_geometry: probability}. Each
+    # entry holds thousands of geometries on full-size boards, hence the LRU.
+    self._round_cache = LRUCache(transition_cache_size)
+    # Results of `round_end_probs`, as (first place probs, second place probs).
+    # Start-of-round positions may repeat across games, so they get a large,
+    # long-lived cache keyed by geometry. Mid-round positions mostly repeat
+    # between consecutive turns, so a small one keyed by
+    # (geometry, camels_not_moved) is enough.
+    self._round_start_probs_cache = LRUCache(round_start_cache_size)
+    self._round_probs_cache = LRUCache(mid_round_cache_size)
+    # geometry -> (first place probs, last place probs). Large enough for every
+    # start-of-round geometry of the boards in `game_odds_tractable`.
+    self._game_cache = LRUCache(game_cache_size)
+
+  def _successors(self, geometry, camels_not_moved):
+    """Equally likely (geometry, camels_not_moved) after the next camel move."""
+    successors = []
+    for camel_id in camels_not_moved:
+      not_moved = tuple(c for c in camels_not_moved if c != camel_id)
+      for roll in range(1, self.n_max_roll + 1):
+        successors.append(
+            (move_camel(geometry, camel_id, roll, self.n_spaces), not_moved))
+    return successors
+
+  def _is_end_of_game(self, geometry):
+    return geometry[0][1] > self.n_spaces
+
+  def round_transitions(self, geometry, camels_not_moved=None):
+    """Distribution over geometries at the end of the round.
+
+    Args:
+      geometry: stack geometry, as returned by `to_geometry`.
+      camels_not_moved: camels still to move this round. Defaults to all camels
+        (i.e. `geometry` is at the start of a round).
+
+    Returns:
+      dict mapping end-of-round geometry to its probability. Geometries where
+      the game ended mid-round are included as-is.
+    """
+    if camels_not_moved is None:
+      camels_not_moved = range(1, self.n_camels + 1)
+    camels_not_moved = tuple(sorted(camels_not_moved))
+    # Only start-of-round transitions are cached: mid-round positions rarely
+    # repeat, and would each hold a large distribution.
+    is_round_start = len(camels_not_moved) == self.n_camels
+    if is_round_start and geometry in self._round_cache:
+      return self._round_cache[geometry]
+
+    dist = self._round_frontier(geometry, camels_not_moved)
+    if is_round_start:
+      self._round_cache[geometry] = dist
+    return dist
+
+  def _round_frontier(self, geometry, camels_not_moved):
+    # Pushes the distribution over (geometry, camels_not_moved) forward one
+    # camel move at a time. Merging equal states keeps the frontier small.
+    frontier = {(geometry, camels_not_moved): 1.0}
+    dist = {}
+    while frontier:
+      next_frontier = {}
+      for (g, not_moved), p in frontier.items():
+        if not not_moved or self._is_end_of_game(g):
+          dist[g] = dist.get(g, 0.0) + p
+          continue
+        successors = self._successors(g, not_moved)
+        p_move = p / len(successors)
+        for successor in successors:
+          next_frontier[successor] = next_frontier.get(successor, 0.0) + p_move
+      frontier = next_frontier
+    return dist
+
+  def round_end_probs(self, b):
+    """Exact first/second place probabilities at the end of the round.
+
+    Returns:
+      (p_first, p_second): arrays of shape (n_camels + 1,), indexed by camel_id.
+    """
+    geometry = to_geometry(b.tracks)
+    camels_not_moved = tuple(sorted(b.round.camels_not_moved))
+    if len(camels_not_moved) == self.n_camels:
+      cache, key = self._round_start_probs_cache, geometry
+    else:
+      cache, key = self._round_probs_cache, (geometry, camels_not_moved)
+    if key in cache:
+      return cache[key]
+
+    p_first = np.zeros((self.n_camels + 1,))
+    p_second = np.zeros((self.n_camels + 1,))
+    for g, p in self._round_frontier(geometry, camels_not_moved).items():
+      p_first[g[0][0]] += p
+      p_second[g[1][0]] += p
+
+    cache[key] = (p_first, p_second)
+    return p_first, p_second
+
+  def game_probs(self, geometry):
+    """Exact winner/loser probabilities from a start-of-round geometry.
+
+    Returns:
+      (p_first, p_last): arrays of shape (n_camels + 1,), indexed by camel_id,
+      with the probability of each camel finishing the game first and last.
+    """
+    if geometry in self._game_cache:
+      return self._game_cache[geometry]
+
+    p_first = np.zeros((self.n_camels + 1,))
+    p_last = np.zeros((self.n_camels + 1,))
+    if self._is_end_of_game(geometry):
+      p_first[geometry[0][0]] = 1
+      p_last[geometry[-1][0]] = 1
+    else:
+      for g, p in self.round_transitions(geometry).items():
+        first, last = self.game_probs(g)
+        p_first += p * first
+        p_last += p * last
+
+    self._game_cache[geometry] = (p_first, p_last)
+    return p_first, p_last
+
+  def game_end_probs(self, b):
+    """Exact winner/loser probabilities for a (possibly mid-round) `Board`."""
+    p_first = np.zeros((self.n_camels + 1,))
+    p_last = np.zeros((self.n_camels + 1,))
+    round_dist = self.round_transitions(
+        to_geometry(b.tracks), b.round.camels_not_moved)
+    for g, p in round_dist.items():
+      first, last = self.game_probs(g)
+      p_first += p * first
+      p_last += p * last
+    return p_first, p_last
@@ -0,0 +1,124 @@
+"""Tests for simulation.game_solver."""
+
+import copy
+import random
+import unittest
+
+import numpy as np
+from parameterized import parameterized
+
+from simulation import board
+from simulation import game_solver
+
+
+def monte_carlo_probs(b, n_games, rng):
+  n_first = np.zeros((b.n_camels + 1,))
+  n_last = np.zeros((b.n_camels + 1,))
+  for _ in range(n_games):
+    new_b = copy.deepcopy(b)
+    while not new_b.tracks.is_end_of_game():
+      new_b.step_randomly(rng)
+    standings = new_b.tracks.camel_standings()
+    n_first[standings[0]] += 1
+    n_last[standings[-1]] += 1
+  return n_first / n_games, n_last / n_games
+
+
+class GameSolverTest(unittest.TestCase):
+  @parameterized.expand([
+    (2, 2, 2),
+    (6, 3, 3),
+  ])
+  def test_round_transitions_sum_to_one(self, n_spaces, n_camels, n_max_roll):
+    solver = game_solver.GameSolver(n_spaces, n_camels, n_max_roll)
+    b = board.Board(n_spaces, n_camels)
+    dist = solver.round_transitions(game_solver.to_geometry(b.tracks))
+    self.assertAlmostEqual(sum(dist.values()), 1.0)
+
+  def test_caches_only_start_of_round_transitions(self):
+    solver = game_solver.GameSolver(
+        n_spaces=6, n_camels=3, transition_cache_size=5)
+    b = board.Board(6, 3)
+    b.apply_move(board.CamelState(1, 2))
+    solver.round_transitions(
+        game_solver.to_geometry(b.tracks), b.round.camels_not_moved)
+    self.assertEqual(len(solver._round_cache), 0)
+
+    solver.game_end_probs(board.Board(6, 3))
+    self.assertEqual(len(solver._round_cache), 5)
+
+  @parameterized.expand([
+    (6, 3),
+    (16, 5),
+  ])
+  def test_move_camel_matches_track_state(self, n_spaces, n_camels):
+    rng = random.Random(0)
+    for _ in range(200):
+      tracks = board.TrackState(n_spaces, n_camels)
+      geometry = game_solver.to_geometry(tracks)
+      while not tracks.is_end_of_game():
+        camel_id = rng.randint(1, n_camels)
+        roll = rng.randint(1, 3)
+        position = tracks.find_camel(camel_id).position
+        tracks.apply_move(board.CamelState(camel_id, position + roll))
+        geometry = game_solver.move_camel(geometry, camel_id, roll, n_spaces)
+        self.assertEqual(geometry, game_solver.to_geometry(tracks))
+
+  def test_move_unknown_camel(self):
+    with self.assertRaises(ValueError):
+      game_solver.move_camel(((1, 2), (3, 1), (2, 1)), 7, 1, 6)
+
+  def test_game_cache_is_bounded(self):
+    solver = game_solver.GameSolver(n_spaces=6, n_camels=3, game_cache_size=10)
+    p_first, _ = solver.game_end_probs(board.Board(6, 3))
+    self.assertEqual(len(solver._game_cache), 10)
+    np.testing.assert_allclose(p_first[1:], [1 / 3] * 3)
+
+  def test_lru_cache(self):
+    cache = game_solver.LRUCache(maxsize=2)
+    cache['a'] = 1
+    cache['b'] = 2
+    self.assertEqual(cache['a'], 1)
+    cache['c'] = 3
+    self.assertIn('a', cache)
+    self.assertNotIn('b', cache)
+    self.assertEqual(len(cache), 2)
+
+  def test_finished_game(self):
+    solver = game_solver.GameSolver(n_spaces=6, n_camels=3)
+    p_first, p_last = solver.game_probs(((2, 7), (3, 5), (1, 1)))
+    np.testing.assert_array_equal(p_first, [0, 0, 1, 0])
+    np.testing.assert_array_equal(p_last, [0, 1, 0, 0])
+
+  def test_symmetric_start(self):
+    solver = game_solver.GameSolver(n_spaces=6, n_camels=3)
+    p_first, p_last = solver.game_end_probs(board.Board(6, 3))
+    self.assertAlmostEqual(sum(p_first), 1.0)
+    self.assertAlmostEqual(sum(p_last), 1.0)
+    np.testing.assert_allclose(p_first[1:], [1 / 3] * 3)
+    np.testing.assert_allclose(p_last[1:], [1 / 3] * 3)
+
+  @parameterized.expand([
+    ([], [1, 2, 3]),
+    ([(1, 3), (2, 3), (3, 1)], [1, 2, 3]),
+    ([(1, 3), (2, 3), (3, 1)], [3]),
+    ([(1, 5), (3, 4), (2, 2)], [2, 3]),
+  ])
+  def test_matches_monte_carlo(self, camel_states, camels_not_moved):
+    b = board.Board(n_spaces=6, n_camels=3)
+    for camel_id, position in camel_states:
+      b.tracks.apply_move(board.CamelState(camel_id, position))
+    b.round.camels_not_moved = camels_not_moved
+
+    solver = game_solver.GameSolver(n_spaces=6, n_camels=3)
+    p_first, p_last = solver.game_end_probs(b)
+    self.assertAlmostEqual(sum(p_first), 1.0)
+    self.assertAlmostEqual(sum(p_last), 1.0)
+
+    mc_first, mc_last = monte_carlo_probs(b, 4000, random.Random(0))
+    np.testing.assert_allclose(p_first, mc_first, atol=0.03)
+    np.testing.assert_allclose(p_last, mc_last, atol=0.03)
+
+
+if __name__ == '__main__':
+  unittest.main()
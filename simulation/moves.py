@@ -0,0 +1,32 @@
+"""Moves that can be applied to the board."""
+from dataclasses import dataclass
+
+
+@dataclass
+class CamelState:
+  camel_id: int
+  position: int
+
+@dataclass
+class TileState:
+  player_id: int
+  plus: bool
+  position: None
+
+@dataclass
+class LegBetState:
+  player_id: int
+  camel_id: int
+
+@dataclass
+class GameBetState:
+  player_id: int
+  camel_id: int
+  winner: bool  # True for a bet on the overall winner, False on the loser.
+
+
+@dataclass
+class CamelMove:
+  """Camel move relative to its current position, as used by `Tracks`."""
+  camel_id: int
+  spaces: int
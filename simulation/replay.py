@@ -0,0 +1,252 @@
+"""Replays logged games and evaluates every turn.
+
+A game log is a json object:
+  {"n_spaces": 16, "n_camels": 5, "n_players": 2,
+   "actions": [{"player": 0, "camel": [camel_id, roll]},
+               {"player": 1, "leg_bet": camel_id},
+               {"player": 0, "game_bet": [camel_id, "winner" | "loser"]},
+               {"player": 1, "tile": [position, plus]}, ...]}
+The board config keys are optional and default to the `Board` defaults.
+Tiles are placed, but `TrackState` doesn't apply their effects, so a log where
+a camel lands on a tile is rejected rather than replayed wrongly.
+
+For every turn the replay records the round odds (and optionally the game odds)
+before the action, the immediate expected value of each available action, and
+the player's EV loss versus the best one. Odds come from a `GameSolver` that is
+shared across turns and games. Its caches are size-limited LRUs, so that memory
+stays flat however many games are replayed.
+
+Games that fail to replay are reported by index on stderr, and the others are
+still written.
+
+Usage:
+  python -m simulation.replay --logs=games.jsonl --output=timeline.jsonl
+"""
+from dataclasses import asdict
+from dataclasses import dataclass
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+from typing import List, Optional
+
+from absl import app
+from absl import flags
+
+from simulation import board
+from simulation import common_flags
+from simulation import game_solver
+
+FLAGS = flags.FLAGS
+
+common_flags.define_game_odds_flag()
+common_flags.define_n_workers_flag()
+flags.DEFINE_string('logs', '', 'Game logs, one json game per line.')
+flags.DEFINE_string('output', '', 'Where to write the per-turn timelines as '
+                    'json lines. Defaults to stdout.')
+
+
+ROLL_EV = 1.0
+
+
+@dataclass
+class Turn:
+  turn: int
+  player: int
+  action: dict
+  # Indexed by camel_id, before the action is applied.
+  round_first: List[float]
+  round_second: List[float]
+  game_first: Optional[List[float]]
+  game_last: Optional[List[float]]
+  # Immediate EV of the action taken, None if it can't be evaluated.
+  action_ev: Optional[float]
+  best_action: dict
+  best_ev: float
+  ev_loss: Optional[float]
+  coins: List[int]
+
+
+def parse_action(entry, b):
+  """Converts a logged action to a move on `b`."""
+  player = entry['player']
+  if 'camel' in entry:
+    camel_id, roll = entry['camel']
+    if not 1 <= camel_id <= b.n_camels:
+      raise ValueError(f'Unknown camel {camel_id}.')
+    position = b.tracks.find_camel(camel_id).position
+    return board.CamelState(camel_id, position + roll)
+  if 'leg_bet' in entry:
+    return board.LegBetState(player, entry['leg_bet'])
+  if 'game_bet' in entry:
+    camel_id, side = entry['game_bet']
+    if side not in ('winner', 'loser'):
+      raise ValueError(f'Unknown game bet side: {side}')
+    return board.GameBetState(player, camel_id, side == 'winner')
+  if 'tile' in entry:
+    position, plus = entry['tile']
+    return board.TileState(player, plus, position)
+  raise ValueError(f'Unknown action: {entry}')
+
+
+def roll_action(b, player, rng=random):
+  """Rolls the dice on `b` with `rng`, as an action in the log format.
+
+  The move is not applied; `parse_action` turns the action back into it.
+  """
+  move = b.round.get_camel_move(rng=rng)
+  position = b.tracks.find_camel(move.camel_id).position
+  return {'player': player, 'camel': [move.camel_id, move.position - position]}
+
+
+def action_evs(b, player, round_odds, game_odds=None):
+  """Immediate expected coins of each action available to `player`.
+
+  Returns:
+    list of (action, ev), with actions in the log format. Tile placements are
+    not evaluated.
+  """
+  p_first, p_second = round_odds
+  evs = [({'player': player, 'camel': None}, ROLL_EV)]
+  for camel_id in range(1, b.n_camels + 1):
+    value = b.available_leg_bet(camel_id)
+    if value is not None:
+      p_other = 1 - p_first[camel_id] - p_second[camel_id]
+      ev = value * p_first[camel_id] + p_second[camel_id] - p_other
+      evs.append(({'player': player, 'leg_bet': camel_id}, ev))
+
+  if game_odds is None:
+    return evs
+  for winner, probs, side in ((True, game_odds[0], 'winner'),
+                              (False, game_odds[1], 'loser')):
+    for camel_id in range(1, b.n_camels + 1):
+      if not b.can_game_bet(player, camel_id):
+        continue
+      n_before = sum(1 for bet in b.game_bets
+                     if bet.winner == winner and bet.camel_id == camel_id)
+      value = board.GAME_BET_VALUES[
+          min(n_before, len(board.GAME_BET_VALUES) - 1)]
+      ev = value * probs[camel_id] - (1 - probs[camel_id])
+      evs.append(({'player': player, 'game_bet': [camel_id, side]}, ev))
+  return evs
+
+
+def _same_action(logged, candidate):
+  for key in ('camel', 'leg_bet', 'game_bet'):
+    if key in candidate:
+      return key in logged and (
+          candidate[key] is None or logged[key] == candidate[key])
+  return False
+
+
+class Replayer:
+  def __init__(self, game_odds=False, **solver_kwargs):
+    """`solver_kwargs` are passed to `GameSolver`, e.g. its cache sizes."""
+    self.game_odds = game_odds
+    self.solver_kwargs = solver_kwargs
+    # (n_spaces, n_camels) -> GameSolver, shared across games.
+    self._solvers = {}
+
+  def _solver(self, n_spaces, n_camels):
+    key = (n_spaces, n_camels)
+    if key not in self._solvers:
+      if self.game_odds and not game_solver.game_odds_tractable(
+          n_spaces, n_camels):
+        raise ValueError(
+            f'Game odds are too slow for n_spaces={n_spaces}, '
+            f'n_camels={n_camels}.')
+      self._solvers[key] = game_solver.GameSolver(
+          n_spaces, n_camels, **self.solver_kwargs)
+    return self._solvers[key]
+
+  def replay(self, game_log):
+    """Replays a game log, returning the list of `Turn`s."""
+    b = board.Board(game_log.get('n_spaces', 16), game_log.get('n_camels', 5),
+                    game_log.get('n_players', 2))
+    solver = self._solver(b.n_spaces, b.n_camels)
+
+    turns = []
+    for i, entry in enumerate(game_log['actions']):
+      if b.tracks.is_end_of_game():
+        raise ValueError(f'Action {i} is after the end of the game.')
+      if b.round.is_end_of_round():
+        b.round.start_new_round()
+
+      player = entry['player']
+      round_odds = solver.round_end_probs(b)
+      game_odds = solver.game_end_probs(b) if self.game_odds else None
+      evs = action_evs(b, player, round_odds, game_odds)
+      best_action, best_ev = max(evs, key=lambda action_ev: action_ev[1])
+      action_ev = next(
+          (ev for action, ev in evs if _same_action(entry, action)), None)
+
+      turns.append(Turn(
+          turn=i,
+          player=player,
+          action=entry,
+          round_first=round_odds[0][1:].tolist(),
+          round_second=round_odds[1][1:].tolist(),
+          game_first=game_odds[0][1:].tolist() if game_odds else None,
+          game_last=game_odds[1][1:].tolist() if game_odds else None,
+          action_ev=action_ev,
+          best_action=best_action,
+          best_ev=best_ev,
+          ev_loss=None if action_ev is None else best_ev - action_ev,
+          coins=list(b.coins),
+      ))
+      move = parse_action(entry, b)
+      if isinstance(move, board.CamelState) and move.position in {
+          tile.position for tile in b.tracks.player_tiles}:
+        raise ValueError(f'Action {i} lands camel {move.camel_id} on a desert '
+                         'tile, whose effects are not modelled.')
+      b.apply_move(move, player)
+    return turns
+
+
+_replayer = None
+
+
+def _init_worker(game_odds):
+  global _replayer
+  _replayer = Replayer(game_odds)
+
+
+def _replay_line(line):
+  """Returns (turns, None), or (None, error) if the game can't be replayed."""
+  try:
+    return [asdict(turn) for turn in _replayer.replay(json.loads(line))], None
+  except (ValueError, KeyError, TypeError) as e:
+    return None, f'{type(e).__name__}: {e}'
+
+
+def main(_):
+  with open(FLAGS.logs) as f:
+    lines = [line for line in f if line.strip()]
+
+  n_workers = FLAGS.n_workers or os.cpu_count()
+  start_time = time.time()
+  out = open(FLAGS.output, 'w') if FLAGS.output else None
+  n_failed = 0
+  with multiprocessing.Pool(
+      n_workers, _init_worker, (FLAGS.game_odds,)) as pool:
+    for game_id, (turns, error) in enumerate(pool.imap(_replay_line, lines)):
+      if error:
+        print(f'FAILED game {game_id}: {error}', file=sys.stderr)
+        n_failed += 1
+        continue
+      print(json.dumps({'game': game_id, 'turns': turns}), file=out)
+  if out:
+    out.close()
+  elapsed = time.time() - start_time
+
+  print(f'Replayed {len(lines) - n_failed} games in {elapsed:.1f}s with '
+        f'{n_workers} workers ({len(lines) / elapsed * 60:.0f} games/minute), '
+        f'{n_failed} failed.', file=sys.stderr)
+  if n_failed:
+    raise SystemExit(1)
+
+
+if __name__ == '__main__':
+  app.run(main)
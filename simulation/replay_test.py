@@ -0,0 +1,139 @@
+"""Tests for simulation.replay."""
+
+import json
+import random
+import unittest
+
+from parameterized import parameterized
+
+from simulation import board
+from simulation import replay
+
+
+def random_game_log(seed, n_spaces, n_camels, n_players=2):
+  """Plays a random game, alternating players, with ~1/3 leg bets."""
+  rng = random.Random(seed)
+  b = board.Board(n_spaces, n_camels, n_players)
+  actions = []
+  while not b.tracks.is_end_of_game():
+    if b.round.is_end_of_round():
+      b.round.start_new_round()
+    player = len(actions) % n_players
+    camel_id = rng.randint(1, n_camels)
+    if rng.random() < 0.3 and b.available_leg_bet(camel_id) is not None:
+      entry = {'player': player, 'leg_bet': camel_id}
+    else:
+      entry = replay.roll_action(b, player, rng)
+    b.apply_move(replay.parse_action(entry, b), player)
+    actions.append(entry)
+  return {'n_spaces': n_spaces, 'n_camels': n_camels, 'n_players': n_players,
+          'actions': actions}, b
+
+
+SURE_ROUND = [
+    {'player': 0, 'camel': [1, 3]},
+    {'player': 1, 'camel': [2, 1]},
+    {'player': 0, 'camel': [3, 1]},
+    {'player': 1, 'camel': [1, 3]},
+    {'player': 0, 'camel': [2, 1]},
+]
+
+
+class ReplayTest(unittest.TestCase):
+  @parameterized.expand([
+    (0, False),
+    (1, True),
+  ])
+  def test_replay_random_game(self, seed, game_odds):
+    game_log, expected_b = random_game_log(seed, n_spaces=6, n_camels=3)
+    turns = replay.Replayer(game_odds).replay(json.loads(json.dumps(game_log)))
+
+    self.assertEqual(len(turns), len(game_log['actions']))
+    for turn in turns:
+      self.assertAlmostEqual(sum(turn.round_first), 1.0)
+      self.assertAlmostEqual(sum(turn.round_second), 1.0)
+      self.assertGreaterEqual(turn.ev_loss, -1e-9)
+      self.assertAlmostEqual(turn.best_ev, turn.action_ev + turn.ev_loss)
+      if game_odds:
+        self.assertAlmostEqual(sum(turn.game_first), 1.0)
+      else:
+        self.assertIsNone(turn.game_first)
+
+    final_b = board.Board(6, 3)
+    for entry in game_log['actions']:
+      if final_b.round.is_end_of_round():
+        final_b.round.start_new_round()
+      final_b.apply_move(replay.parse_action(entry, final_b), entry['player'])
+    self.assertEqual(final_b.coins, expected_b.coins)
+
+  def test_ev_of_sure_leg_bet(self):
+    # Camel 1 ends 4 spaces ahead of the 3-on-2 stack with only camel 3 left to
+    # move, so it wins the round for sure and camel 3 comes second.
+    game_log = {'n_spaces': 16, 'n_camels': 3, 'actions': SURE_ROUND + [
+        {'player': 1, 'leg_bet': 1},
+        {'player': 0, 'leg_bet': 1},
+    ]}
+    turns = replay.Replayer().replay(game_log)
+    self.assertEqual(turns[5].round_first, [1, 0, 0])
+    self.assertEqual(turns[5].round_second, [0, 0, 1])
+    self.assertEqual(turns[5].best_action, {'player': 1, 'leg_bet': 1})
+    self.assertAlmostEqual(turns[5].best_ev, 5)
+    self.assertAlmostEqual(turns[5].ev_loss, 0)
+    self.assertAlmostEqual(turns[6].best_ev, 3)
+
+  def test_ev_loss_of_roll(self):
+    game_log = {'n_spaces': 16, 'n_camels': 3, 'actions': SURE_ROUND + [
+        {'player': 1, 'camel': [3, 1]},
+    ]}
+    turns = replay.Replayer().replay(game_log)
+    self.assertAlmostEqual(turns[5].action_ev, replay.ROLL_EV)
+    self.assertAlmostEqual(turns[5].ev_loss, 5 - replay.ROLL_EV)
+
+  def test_solver_caches_stay_bounded(self):
+    replayer = replay.Replayer(
+        round_start_cache_size=5, mid_round_cache_size=10)
+    for seed in range(20):
+      replayer.replay(random_game_log(seed, n_spaces=6, n_camels=3)[0])
+    solver = replayer._solver(6, 3)
+    self.assertEqual(len(solver._round_start_probs_cache), 5)
+    self.assertEqual(len(solver._round_probs_cache), 10)
+
+  def test_game_odds_refused_on_large_boards(self):
+    with self.assertRaises(ValueError):
+      replay.Replayer(game_odds=True).replay(
+          {'n_spaces': 16, 'n_camels': 5, 'actions': []})
+
+  def test_camel_landing_on_tile(self):
+    game_log = {'n_spaces': 16, 'n_camels': 3, 'actions': [
+        {'player': 0, 'tile': [4, True]},
+        {'player': 1, 'camel': [1, 3]},
+        {'player': 0, 'camel': [2, 2]},
+    ]}
+    self.assertEqual(len(replay.Replayer().replay(game_log)), 3)
+    game_log['actions'][1]['camel'] = [1, 4]
+    with self.assertRaises(ValueError):
+      replay.Replayer().replay(game_log)
+
+  def test_replay_line_reports_errors(self):
+    replay._init_worker(False)
+    game_log, _ = random_game_log(0, n_spaces=6, n_camels=3)
+    turns, error = replay._replay_line(json.dumps(game_log))
+    self.assertEqual(len(turns), len(game_log['actions']))
+    self.assertIsNone(error)
+    game_log['actions'].append({'player': 0, 'leg_bet': 1})
+    turns, error = replay._replay_line(json.dumps(game_log))
+    self.assertIsNone(turns)
+    self.assertIn('after the end of the game', error)
+    self.assertEqual(replay._replay_line('{')[0], None)
+
+  def test_action_after_end_of_game(self):
+    game_log = {'n_spaces': 2, 'n_camels': 2, 'actions': [
+        {'player': 0, 'camel': [1, 3]},
+        {'player': 1, 'camel': [2, 1]},
+    ]}
+    with self.assertRaises(ValueError):
+      replay.Replayer().replay(game_log)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,234 @@
+"""Fixed-width binary serialization of `Board`s.
+
+Every board is a record of a numpy structured dtype that only depends on
+(n_spaces, n_camels, n_players), so arrays of boards can be exchanged between
+processes, stored and memory-mapped without per-object overhead. The config is
+kept in the dtype's `metadata`, so record arrays describe themselves; see
+`record_config`. Fields:
+  - camel_ids, camel_positions: `TrackState.camel_states`, in the same order
+    (first to last position, top to bottom within a stack).
+  - camels_not_moved: bitmask, bit `camel_id - 1` set if the camel hasn't moved
+    this round.
+  - tile_positions, tile_plus: player tiles, position 0 if not on the track.
+  - coins: coins of every player.
+  - leg_bet_owners: [camel_id - 1, k] is the player holding the k-th leg bet
+    tile (in `board.LEG_BET_VALUES` order) on the camel, -1 if not taken.
+  - game_bet_order: [player, camel_id - 1] is the order in which the game bet
+    was placed, -1 if none. game_bet_winner is its side.
+
+File layout: a HEADER_SIZE byte header followed by the records. The header
+holds the config and the number of leg bet tiles per camel (the
+`len(board.LEG_BET_VALUES)` dimension of leg_bet_owners), so files written with
+different rules are rejected. Bump FORMAT_VERSION whenever the record layout or
+the header changes.
+"""
+import struct
+
+import numpy as np
+
+from simulation import board
+
+FORMAT_VERSION = 2
+MAGIC = b'CAMELUP\0'
+# magic, version, n_spaces, n_camels, n_players, n_leg_bets, n_records.
+HEADER_FORMAT = '<8sHHBBBQ'
+HEADER_SIZE = 32
+
+
+def record_dtype(n_spaces, n_camels, n_players):
+  """The record dtype of a config, with the config in its `metadata`."""
+  if n_spaces + 1 > np.iinfo(np.uint8).max:
+    raise ValueError(f'n_spaces={n_spaces} does not fit in a uint8 position.')
+  if n_camels > 32:
+    raise ValueError(f'n_camels={n_camels} does not fit in the bitmask.')
+  n_leg_bets = len(board.LEG_BET_VALUES)
+  return np.dtype([
+      ('camel_ids', 'u1', (n_camels,)),
+      ('camel_positions', 'u1', (n_camels,)),
+      ('camels_not_moved', '<u4'),
+      ('tile_positions', 'u1', (n_players,)),
+      ('tile_plus', '?', (n_players,)),
+      ('coins', '<i2', (n_players,)),
+      ('leg_bet_owners', 'i1', (n_camels, n_leg_bets)),
+      ('game_bet_order', '<i2', (n_players, n_camels)),
+      ('game_bet_winner', '?', (n_players, n_camels)),
+  ], metadata={'n_spaces': n_spaces, 'n_camels': n_camels,
+               'n_players': n_players})
+
+
+def record_config(records):
+  """Returns the (n_spaces, n_camels, n_players) of a record array."""
+  metadata = records.dtype.metadata
+  if not metadata or 'n_spaces' not in metadata:
+    raise ValueError('Records have no config, use a dtype from record_dtype.')
+  return metadata['n_spaces'], metadata['n_camels'], metadata['n_players']
+
+
+def encode(boards, n_spaces=None, n_camels=None, n_players=None):
+  """Encodes a list of boards with the same config to a record array.
+
+  The config arguments are only needed when `boards` is empty.
+  """
+  if boards:
+    n_spaces = boards[0].n_spaces
+    n_camels = boards[0].n_camels
+    n_players = boards[0].n_players
+  records = np.zeros(len(boards), record_dtype(n_spaces, n_camels, n_players))
+  if not boards:
+    return records
+
+  # Gather every field as nested lists, then convert each one in a single call.
+  camel_ids, camel_positions, camels_not_moved = [], [], []
+  tile_positions, tile_plus, coins = [], [], []
+  leg_bet_owners, game_bet_order, game_bet_winner = [], [], []
+  n_leg_bets = len(board.LEG_BET_VALUES)
+  for b in boards:
+    if (b.n_spaces, b.n_camels, b.n_players) != (n_spaces, n_camels, n_players):
+      raise ValueError('All boards must have the same config.')
+    camel_ids.append([c.camel_id for c in b.tracks.camel_states])
+    camel_positions.append([c.position for c in b.tracks.camel_states])
+    camels_not_moved.append(
+        sum(1 << (camel_id - 1) for camel_id in b.round.camels_not_moved))
+    tile_positions.append(
+        [tile.position or 0 for tile in b.tracks.player_tiles])
+    tile_plus.append([tile.plus for tile in b.tracks.player_tiles])
+    coins.append(b.coins)
+
+    owners = [[-1] * n_leg_bets for _ in range(n_camels)]
+    for bet, value in b.leg_bets:
+      owners[bet.camel_id - 1][board.LEG_BET_VALUES.index(value)] = (
+          bet.player_id)
+    leg_bet_owners.append(owners)
+
+    order = [[-1] * n_camels for _ in range(n_players)]
+    winner = [[False] * n_camels for _ in range(n_players)]
+    for i, bet in enumerate(b.game_bets):
+      order[bet.player_id][bet.camel_id - 1] = i
+      winner[bet.player_id][bet.camel_id - 1] = bet.winner
+    game_bet_order.append(order)
+    game_bet_winner.append(winner)
+
+  records['camel_ids'] = camel_ids
+  records['camel_positions'] = camel_positions
+  records['camels_not_moved'] = camels_not_moved
+  records['tile_positions'] = tile_positions
+  records['tile_plus'] = tile_plus
+  records['coins'] = coins
+  records['leg_bet_owners'] = leg_bet_owners
+  records['game_bet_order'] = game_bet_order
+  records['game_bet_winner'] = game_bet_winner
+  return records
+
+
+def decode(records):
+  """Decodes a record array, memmap or single record to a list of boards."""
+  records = np.atleast_1d(records)
+  n_spaces, n_camels, n_players = record_config(records)
+  # Convert each field to nested lists once rather than indexing per record.
+  camel_ids = records['camel_ids'].tolist()
+  camel_positions = records['camel_positions'].tolist()
+  camels_not_moved = records['camels_not_moved'].tolist()
+  tile_positions = records['tile_positions'].tolist()
+  tile_plus = records['tile_plus'].tolist()
+  coins = records['coins'].tolist()
+  leg_bet_owners = records['leg_bet_owners'].tolist()
+  game_bet_order = records['game_bet_order'].tolist()
+  game_bet_winner = records['game_bet_winner'].tolist()
+
+  boards = []
+  for i in range(len(records)):
+    b = board.Board(n_spaces, n_camels, n_players)
+    b.tracks.camel_states = [
+        board.CamelState(camel_id, position)
+        for camel_id, position in zip(camel_ids[i], camel_positions[i])]
+    b.round.camels_not_moved = [
+        camel_id for camel_id in range(1, n_camels + 1)
+        if camels_not_moved[i] >> (camel_id - 1) & 1]
+    b.tracks.player_tiles = [
+        board.TileState(player_id, plus, position or None)
+        for player_id, (position, plus)
+        in enumerate(zip(tile_positions[i], tile_plus[i]))]
+    b.coins = coins[i]
+
+    for camel_id, owners in enumerate(leg_bet_owners[i], 1):
+      for value, player_id in zip(board.LEG_BET_VALUES, owners):
+        if player_id >= 0:
+          b.leg_bets.append((board.LegBetState(player_id, camel_id), value))
+      b.leg_bet_tiles[camel_id] = [
+          value for value, player_id in zip(board.LEG_BET_VALUES, owners)
+          if player_id < 0]
+
+    game_bets = []
+    for player_id in range(n_players):
+      for camel_id in range(1, n_camels + 1):
+        order = game_bet_order[i][player_id][camel_id - 1]
+        if order >= 0:
+          winner = game_bet_winner[i][player_id][camel_id - 1]
+          game_bets.append(
+              (order, board.GameBetState(player_id, camel_id, winner)))
+    b.game_bets = [bet for _, bet in sorted(game_bets, key=lambda x: x[0])]
+    boards.append(b)
+  return boards
+
+
+def write_header(f, n_spaces, n_camels, n_players, n_records):
+  header = struct.pack(HEADER_FORMAT, MAGIC, FORMAT_VERSION, n_spaces,
+                       n_camels, n_players, len(board.LEG_BET_VALUES),
+                       n_records)
+  f.write(header.ljust(HEADER_SIZE, b'\0'))
+
+
+def read_header(f):
+  """Returns (n_spaces, n_camels, n_players, n_records)."""
+  header = f.read(HEADER_SIZE)
+  if len(header) != HEADER_SIZE:
+    raise ValueError('File is too short to contain a header.')
+  (magic, version, n_spaces, n_camels, n_players, n_leg_bets,
+   n_records) = struct.unpack_from(HEADER_FORMAT, header)
+  if magic != MAGIC:
+    raise ValueError('Not a camel up board file.')
+  if version != FORMAT_VERSION:
+    raise ValueError(
+        f'Unsupported format version {version}, expected {FORMAT_VERSION}.')
+  if n_leg_bets != len(board.LEG_BET_VALUES):
+    raise ValueError(f'File has {n_leg_bets} leg bets per camel, expected '
+                     f'{len(board.LEG_BET_VALUES)}.')
+  return n_spaces, n_camels, n_players, n_records
+
+
+def save(path, records):
+  """Writes a record array, as returned by `encode`, to `path`."""
+  n_spaces, n_camels, n_players = record_config(records)
+  with open(path, 'wb') as f:
+    write_header(f, n_spaces, n_camels, n_players, len(records))
+    f.write(np.ascontiguousarray(records).tobytes())
+
+
+def load(path, mode='r'):
+  """Memory-maps the records of a file written by `save` or `create`.
+
+  Returns:
+    A numpy memmap of the record dtype, so fields can be sliced without reading
+    the whole file.
+  """
+  with open(path, 'rb') as f:
+    n_spaces, n_camels, n_players, n_records = read_header(f)
+  dtype = record_dtype(n_spaces, n_camels, n_players)
+  if n_records == 0:
+    return np.zeros(0, dtype)
+  return np.memmap(
+      path, dtype=dtype, mode=mode, offset=HEADER_SIZE, shape=(n_records,))
+
+
+def create(path, n_records, n_spaces, n_camels, n_players):
+  """Creates a file for `n_records` boards and returns its writable memmap.
+
+  Lets large datasets be filled in chunks, e.g.
+    records = create(path, n, ...)
+    records[i:i+k] = encode(boards[i:i+k])
+  """
+  with open(path, 'wb') as f:
+    write_header(f, n_spaces, n_camels, n_players, n_records)
+  # Opening past the end of the file grows it to fit the records.
+  return np.memmap(path, dtype=record_dtype(n_spaces, n_camels, n_players),
+                   mode='r+', offset=HEADER_SIZE, shape=(n_records,))
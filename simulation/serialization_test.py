@@ -0,0 +1,150 @@
+"""Tests for simulation.serialization."""
+
+import os
+import random
+import tempfile
+import unittest
+
+import numpy as np
+from parameterized import parameterized
+
+from simulation import board
+from simulation import serialization
+
+
+def random_boards(n_boards, n_spaces=16, n_camels=5, n_players=3, seed=0):
+  """Boards after random camel moves, leg bets, game bets and tiles."""
+  rng = random.Random(seed)
+  boards = []
+  for _ in range(n_boards):
+    b = board.Board(n_spaces, n_camels, n_players)
+    for _ in range(rng.randint(0, 20)):
+      if b.tracks.is_end_of_game():
+        break
+      player_id = rng.randrange(n_players)
+      camel_id = rng.randint(1, n_camels)
+      action = rng.randrange(4)
+      if action == 0 and b.available_leg_bet(camel_id) is not None:
+        b.apply_move(board.LegBetState(player_id, camel_id), player_id)
+      elif action == 1 and b.can_game_bet(player_id, camel_id):
+        b.apply_move(board.GameBetState(
+            player_id, camel_id, rng.random() < 0.5), player_id)
+      elif action == 2:
+        position = rng.randint(1, n_spaces)
+        if b.can_place_tile(player_id, position):
+          b.apply_move(board.TileState(
+              player_id, rng.random() < 0.5, position), player_id)
+      else:
+        b.step_randomly(rng, player_id)
+    boards.append(b)
+  return boards
+
+
+def board_state(b):
+  return (
+      [(c.camel_id, c.position) for c in b.tracks.camel_states],
+      sorted(b.round.camels_not_moved),
+      b.tracks.player_tiles,
+      b.coins,
+      b.leg_bet_tiles,
+      sorted((bet.camel_id, value, bet.player_id) for bet, value in b.leg_bets),
+      b.game_bets,
+  )
+
+
+class SerializationTest(unittest.TestCase):
+  @parameterized.expand([
+    (16, 5, 2),
+    (6, 3, 4),
+  ])
+  def test_round_trip(self, n_spaces, n_camels, n_players):
+    boards = random_boards(200, n_spaces, n_camels, n_players)
+    records = serialization.encode(boards)
+    self.assertEqual(records.shape, (200,))
+    decoded = serialization.decode(records)
+    for b, d in zip(boards, decoded):
+      self.assertEqual(board_state(b), board_state(d))
+
+  def test_decoded_board_keeps_playing(self):
+    b = random_boards(1, seed=3)[0]
+    d, = serialization.decode(serialization.encode([b]))
+    rng = random.Random(0)
+    while not b.tracks.is_end_of_game():
+      if d.round.is_end_of_round():
+        d.round.start_new_round()
+      d.apply_move(b.step_randomly(rng, 0), 0)
+    self.assertEqual(board_state(b), board_state(d))
+
+  def test_fixed_width(self):
+    records = serialization.encode(random_boards(10))
+    itemsize = serialization.record_dtype(16, 5, 3).itemsize
+    self.assertEqual(len(records.tobytes()), 10 * itemsize)
+    self.assertEqual(
+        serialization.decode(
+            np.frombuffer(records.tobytes(), records.dtype))[3].coins,
+        serialization.decode(records)[3].coins)
+
+  def test_empty(self):
+    records = serialization.encode([], n_spaces=16, n_camels=5, n_players=2)
+    self.assertEqual(serialization.decode(records), [])
+
+  def test_save_and_load(self):
+    boards = random_boards(50)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      path = os.path.join(tmp_dir, 'boards.bin')
+      serialization.save(path, serialization.encode(boards))
+      records = serialization.load(path)
+      self.assertIsInstance(records, np.memmap)
+      self.assertEqual(serialization.record_config(records), (16, 5, 3))
+      np.testing.assert_array_equal(
+          records['coins'], [b.coins for b in boards])
+      for b, d in zip(boards[10:20],
+                      serialization.decode(records[10:20])):
+        self.assertEqual(board_state(b), board_state(d))
+      del records
+
+  def test_create_in_chunks(self):
+    boards = random_boards(25)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      path = os.path.join(tmp_dir, 'boards.bin')
+      records = serialization.create(path, 25, 16, 5, 3)
+      for i in range(0, 25, 10):
+        records[i:i+10] = serialization.encode(boards[i:i+10])
+      records.flush()
+      del records
+
+      records = serialization.load(path)
+      for b, d in zip(boards, serialization.decode(records)):
+        self.assertEqual(board_state(b), board_state(d))
+      del records
+
+  def test_config_travels_with_records(self):
+    records = serialization.encode(random_boards(10, n_spaces=6, n_camels=3))
+    for r in (records[2:5], records[3], records.copy(),
+              np.frombuffer(records.tobytes(), records.dtype)):
+      self.assertEqual(serialization.record_config(r), (6, 3, 3))
+    with self.assertRaises(ValueError):
+      serialization.decode(np.zeros(1, records.dtype.descr))
+
+  def test_decode_single_record(self):
+    boards = random_boards(5)
+    d, = serialization.decode(serialization.encode(boards)[3])
+    self.assertEqual(board_state(d), board_state(boards[3]))
+
+  @parameterized.expand([
+    ('version', len(serialization.MAGIC), b'\xff\xff'),
+    ('n_leg_bets', len(serialization.MAGIC) + 6, b'\x07'),
+  ])
+  def test_load_rejects_header(self, _, offset, data):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      path = os.path.join(tmp_dir, 'boards.bin')
+      serialization.save(path, serialization.encode(random_boards(2)))
+      with open(path, 'r+b') as f:
+        f.seek(offset)
+        f.write(data)
+      with self.assertRaises(ValueError):
+        serialization.load(path)
+
+
+if __name__ == '__main__':
+  unittest.main()
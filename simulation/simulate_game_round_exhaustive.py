@@ -1,31 +1,35 @@
 import copy
-import functools
+import json
+import sys
 
 from absl import app
 from absl import flags
-from absl import logging
-import json
-import numpy as np
 
 from simulation import board
-from simulation import game_round
+from simulation import common_flags
 
 FLAGS = flags.FLAGS
 
-flags.DEFINE_integer('n_spaces', 16, 'Number of spaces in the race track.')
-flags.DEFINE_integer('n_camels', 5, 'Number of camels in the race track.')
+common_flags.define_board_flags()
+common_flags.define_game_odds_flag()
 flags.DEFINE_integer('n_players', 2, 'Number of players in the game.')
 flags.DEFINE_string('initial_state', '',
     'Initial state of the board, serialized as json. Supported key-values: \n'
     ' a) "camel_states": [[camel_id, position], ...]. Example: [[1, 10], [2, 11]] \n'
     ' b) "camels_not_moved": [camel_id, ...]. Example: [2, 4, 5] \n')
+flags.DEFINE_bool('repl', False,
+    'Answer queries from stdin until EOF instead of a single query. Each line '
+    'is an --initial_state json, and each answer is a json line with the '
+    '"first" and "second" place (and with --game_odds, "game_first" and '
+    '"game_last") probabilities indexed by camel_id - 1. Search results are '
+    'cached across queries.')
 
 
 def round_end_probs(b):
 
   def tree_search(board_state):
-    n_first_place = np.zeros((b.n_camels + 1,))
-    n_second_place = np.zeros((b.n_camels + 1,))
+    n_first_place = [0] * (b.n_camels + 1)
+    n_second_place = [0] * (b.n_camels + 1)
 
     if board_state.tracks.is_end_of_game() or board_state.round.is_end_of_round():
       standings = board_state.tracks.camel_standings()
@@ -38,8 +42,8 @@ def round_end_probs(b):
       new_b = copy.deepcopy(board_state)
       new_b.apply_move(move)
       first, second = tree_search(new_b)
-      n_first_place += first
-      n_second_place += second
+      n_first_place = [n + m for n, m in zip(n_first_place, first)]
+      n_second_place = [n + m for n, m in zip(n_second_place, second)]
 
     return n_first_place, n_second_place
 
@@ -48,25 +52,80 @@ def round_end_probs(b):
   n_simulations = sum(n_1st)
 
   print(f'Exhaustive search through {n_simulations} simulations.')
-  print(f'First place percentages: {n_1st / n_simulations}')
-  print(f'Second place percentages: {n_2nd / n_simulations}')
-  return 
+  return [n / n_simulations for n in n_1st], [n / n_simulations for n in n_2nd]
 
-def main(_):
-  b = board.Board(FLAGS.n_spaces, FLAGS.n_camels, FLAGS.n_players)
 
-  # Apply initial states if provided.
-  init_state = json.loads(FLAGS.initial_state) if FLAGS.initial_state else {}
+def board_from_initial_state(init_state, n_spaces, n_camels, n_players):
+  """Builds a `Board` from an --initial_state dict.
+
+  Raises:
+    ValueError: if a camel id is not in [1, n_camels], a camel is listed twice
+      in camels_not_moved, or the camel positions are not legal.
+  """
+  b = board.Board(n_spaces, n_camels, n_players)
+
+  def check_camel_id(camel_id):
+    if not 1 <= camel_id <= n_camels:
+      raise ValueError(f'Unknown camel {camel_id}, expected [1, {n_camels}].')
 
   if 'camel_states' in init_state:
     camel_states = init_state['camel_states']
     camel_states = [board.CamelState(i, p) for i, p in camel_states]
     for camel_state in camel_states:
+      check_camel_id(camel_state.camel_id)
       b.tracks.apply_move(camel_state)
+    legal, reason = b.tracks.is_legal_state()
+    if not legal:
+      raise ValueError(reason)
   if 'camels_not_moved' in init_state:
     camels_not_moved = init_state['camels_not_moved']
     camels_not_moved = list(map(int, camels_not_moved))
+    for camel_id in camels_not_moved:
+      check_camel_id(camel_id)
+    if len(set(camels_not_moved)) != len(camels_not_moved):
+      raise ValueError(f'Duplicate camels in {camels_not_moved}.')
     b.round.camels_not_moved = camels_not_moved
+  return b
+
+
+def repl(lines, out):
+  """Answers one json query per line, reusing a single solver."""
+  # Loaded here, not at the top, so that single queries don't pay for numpy.
+  from simulation import game_solver
+  solver = game_solver.GameSolver(FLAGS.n_spaces, FLAGS.n_camels)
+
+  for line in lines:
+    if not line.strip():
+      continue
+    try:
+      b = board_from_initial_state(
+          json.loads(line), FLAGS.n_spaces, FLAGS.n_camels, FLAGS.n_players)
+      p_first, p_second = solver.round_end_probs(b)
+      answer = {'first': p_first[1:].tolist(), 'second': p_second[1:].tolist()}
+      if FLAGS.game_odds:
+        game_first, game_last = solver.game_end_probs(b)
+        answer['game_first'] = game_first[1:].tolist()
+        answer['game_last'] = game_last[1:].tolist()
+    except (ValueError, KeyError, TypeError) as e:
+      answer = {'error': f'{type(e).__name__}: {e}'}
+    print(json.dumps(answer), file=out, flush=True)
+
+
+def main(_):
+  if FLAGS.game_odds:
+    from simulation import game_solver
+    if not game_solver.game_odds_tractable(FLAGS.n_spaces, FLAGS.n_camels):
+      raise app.UsageError(
+          f'--game_odds is too slow for n_spaces={FLAGS.n_spaces}, '
+          f'n_camels={FLAGS.n_camels}. Use at most 3 camels, or 4 camels on at '
+          'most 12 spaces.')
+  if FLAGS.repl:
+    return repl(sys.stdin, sys.stdout)
+
+  # Apply initial states if provided.
+  init_state = json.loads(FLAGS.initial_state) if FLAGS.initial_state else {}
+  b = board_from_initial_state(
+      init_state, FLAGS.n_spaces, FLAGS.n_camels, FLAGS.n_players)
 
   print(
       f'Running with n_spaces={FLAGS.n_spaces}, '
@@ -75,8 +134,16 @@ def main(_):
   b.print()
 
   print('End of round probabilities: ')
-  print(round_end_probs(b))
-  
+  p_first, p_second = round_end_probs(b)
+  print(f'First place percentages: {p_first}')
+  print(f'Second place percentages: {p_second}')
+
+  if FLAGS.game_odds:
+    solver = game_solver.GameSolver(FLAGS.n_spaces, FLAGS.n_camels)
+    p_first, p_last = solver.game_end_probs(b)
+    print('End of game probabilities: ')
+    print(f'First place percentages: {p_first}')
+    print(f'Last place percentages: {p_last}')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,266 @@
+"""Plays betting policies against each other.
+
+Every game seats one policy per player and runs on `Board`, which tracks coins,
+leg bets and game bets per player. Desert tiles are out of scope: `TrackState`
+doesn't apply their effects and the solver doesn't model them, so policies
+never place tiles. The starting player rotates between games. A game is won
+by the player with the most coins at the end, ties split the win. Games are
+distributed over a process pool and the runner reports win rates with 95%
+confidence intervals, mean coins and throughput.
+
+Policies return actions in the `replay` log format, with {"camel": None} for
+rolling the dice; games can be logged with the roll filled in and replayed.
+The dice of a game only depend on its seed, so every matchup plays the same
+rolls for a given seed. Policies draw from their own RNGs.
+
+Usage:
+  python -m simulation.tournament --policies=greedy,random --n_games=1000
+"""
+import json
+import math
+import multiprocessing
+import os
+import random
+import time
+
+from absl import app
+from absl import flags
+
+from simulation import board
+from simulation import common_flags
+from simulation import game_solver
+from simulation import replay
+
+FLAGS = flags.FLAGS
+
+common_flags.define_board_flags()
+common_flags.define_seed_flag()
+common_flags.define_n_workers_flag()
+
+flags.DEFINE_list('policies', ['greedy', 'random'],
+                  'Policy of each player: random, greedy or search.')
+flags.DEFINE_integer('n_games', 1000, 'Number of games to play.',
+                     lower_bound=1)
+flags.DEFINE_string('log_games', '',
+                    'If set, writes the game logs there as json lines, in the '
+                    'format read by simulation.replay.')
+
+
+def available_actions(b, player_id):
+  """All actions available to `player_id`, in the `replay` log format.
+
+  Rolls, leg bets and game bets. Tiles are out of scope, see the module
+  docstring.
+  """
+  actions = [{'player': player_id, 'camel': None}]
+  for camel_id in range(1, b.n_camels + 1):
+    if b.available_leg_bet(camel_id) is not None:
+      actions.append({'player': player_id, 'leg_bet': camel_id})
+  for camel_id in range(1, b.n_camels + 1):
+    if b.can_game_bet(player_id, camel_id):
+      actions.append({'player': player_id, 'game_bet': [camel_id, 'winner']})
+      actions.append({'player': player_id, 'game_bet': [camel_id, 'loser']})
+  return actions
+
+
+class RandomPolicy:
+  """Picks rolls, leg bets and game bets uniformly at random."""
+
+  def __init__(self, n_spaces, n_camels):
+    pass
+
+  def choose_action(self, b, player_id, rng):
+    actions = available_actions(b, player_id)
+    kind = rng.choice(
+        sorted({key for a in actions for key in a if key != 'player'}))
+    return rng.choice([a for a in actions if kind in a])
+
+
+class GreedyPolicy:
+  """Takes the action with the best immediate EV, from exact round odds.
+
+  Doesn't place game bets, since exact game odds are too slow to compute on
+  full-size boards. `solver_kwargs` are passed to `GameSolver`, e.g. its cache
+  sizes; the caches are size-limited, so a long-lived policy stays bounded.
+  """
+
+  def __init__(self, n_spaces, n_camels, **solver_kwargs):
+    self.solver = game_solver.GameSolver(n_spaces, n_camels, **solver_kwargs)
+
+  def choose_action(self, b, player_id, rng):
+    evs = replay.action_evs(b, player_id, self.solver.round_end_probs(b))
+    return max(evs, key=lambda action_ev: action_ev[1])[0]
+
+
+class SearchPolicy:
+  """Takes the action with the best immediate EV, from Monte Carlo rollouts.
+
+  Rollouts estimate both the round and the game odds, so unlike
+  `GreedyPolicy` it also places game bets.
+  """
+
+  def __init__(self, n_spaces, n_camels, n_rollouts=100):
+    self.n_camels = n_camels
+    self.n_rollouts = n_rollouts
+
+  def rollout_odds(self, b, rng):
+    """Returns ((round first, round second), (game first, game last))."""
+    counts = [[0] * (self.n_camels + 1) for _ in range(4)]
+    for _ in range(self.n_rollouts):
+      # Only the camels matter, so roll out on a board without players.
+      rollout = board.Board(b.n_spaces, b.n_camels, n_players=0)
+      rollout.tracks.camel_states = [board.CamelState(c.camel_id, c.position)
+                                     for c in b.tracks.camel_states]
+      rollout.round.n_max_roll = b.round.n_max_roll
+      rollout.round.camels_not_moved = list(b.round.camels_not_moved)
+      round_standings = None
+      while not rollout.tracks.is_end_of_game():
+        rollout.step_randomly(rng)
+        if round_standings is None and rollout.round.is_end_of_round():
+          round_standings = rollout.tracks.camel_standings()
+      game_standings = rollout.tracks.camel_standings()
+      round_standings = round_standings or game_standings
+      counts[0][round_standings[0]] += 1
+      counts[1][round_standings[1]] += 1
+      counts[2][game_standings[0]] += 1
+      counts[3][game_standings[-1]] += 1
+    p = [[n / self.n_rollouts for n in c] for c in counts]
+    return (p[0], p[1]), (p[2], p[3])
+
+  def choose_action(self, b, player_id, rng):
+    round_odds, game_odds = self.rollout_odds(b, rng)
+    evs = replay.action_evs(b, player_id, round_odds, game_odds)
+    return max(evs, key=lambda action_ev: action_ev[1])[0]
+
+
+POLICIES = {
+    'random': RandomPolicy,
+    'greedy': GreedyPolicy,
+    'search': SearchPolicy,
+}
+
+
+def play_game(policies, n_spaces, n_camels, seed):
+  """Plays one game, seating `policies[i]` as player i.
+
+  The dice are rolled from `random.Random(seed)`, and each player's policy
+  draws from its own RNG seeded from (seed, player), so the rolls don't depend
+  on the policies seated.
+
+  Returns:
+    (final coins per player, game log in the `replay` format).
+  """
+  dice = random.Random(seed)
+  n_players = len(policies)
+  policy_rngs = [random.Random(f'{seed}/{player_id}')
+                 for player_id in range(n_players)]
+  b = board.Board(n_spaces, n_camels, n_players)
+  actions = []
+  player_id = seed % n_players
+  while not b.tracks.is_end_of_game():
+    if b.round.is_end_of_round():
+      b.round.start_new_round()
+
+    action = policies[player_id].choose_action(
+        b, player_id, policy_rngs[player_id])
+    if 'camel' in action and action['camel'] is None:
+      action = replay.roll_action(b, player_id, dice)
+    b.apply_move(replay.parse_action(action, b), player_id)
+    actions.append(action)
+    player_id = (player_id + 1) % n_players
+
+  game_log = {'n_spaces': n_spaces, 'n_camels': n_camels,
+              'n_players': n_players, 'actions': actions}
+  return b.coins, game_log
+
+
+def wilson_interval(wins, n, z=1.96):
+  """Wilson score interval of a win rate."""
+  if n == 0:
+    return 0.0, 1.0
+  p = wins / n
+  center = (p + z**2 / (2 * n)) / (1 + z**2 / n)
+  half_width = z * math.sqrt(p * (1 - p) / n + z**2 / (4 * n**2)) / (
+      1 + z**2 / n)
+  return max(center - half_width, 0.0), min(center + half_width, 1.0)
+
+
+_worker_policies = None
+
+
+def _init_worker(policy_names, n_spaces, n_camels):
+  # Policies live for the whole worker so that their (size-limited) caches
+  # carry over games.
+  global _worker_policies
+  _worker_policies = [
+      POLICIES[name](n_spaces, n_camels) for name in policy_names]
+
+
+def _play_games(args):
+  seeds, n_spaces, n_camels = args
+  results = []
+  for seed in seeds:
+    start_time = time.time()
+    coins, game_log = play_game(_worker_policies, n_spaces, n_camels, seed)
+    results.append((coins, game_log, time.time() - start_time))
+  return results
+
+
+def main(_):
+  # Defined by `replay`, whose library functions the policies use.
+  if FLAGS['game_odds'].present:
+    raise app.UsageError('--game_odds is not supported by the tournament.')
+  n_players = len(FLAGS.policies)
+  for name in FLAGS.policies:
+    if name not in POLICIES:
+      raise ValueError(f'Unknown policy {name}, expected one of '
+                       f'{sorted(POLICIES)}.')
+
+  n_workers = FLAGS.n_workers or os.cpu_count()
+  chunk_size = 10
+  chunks = [
+      (range(start, min(start + chunk_size, FLAGS.seed + FLAGS.n_games)),
+       FLAGS.n_spaces, FLAGS.n_camels)
+      for start in range(FLAGS.seed, FLAGS.seed + FLAGS.n_games, chunk_size)
+  ]
+
+  wins = [0.0] * n_players
+  total_coins = [0] * n_players
+  n_games = 0
+  n_turns = 0
+  game_seconds = 0.0
+  log_file = open(FLAGS.log_games, 'w') if FLAGS.log_games else None
+  start_time = time.time()
+  with multiprocessing.Pool(
+      n_workers, _init_worker,
+      (FLAGS.policies, FLAGS.n_spaces, FLAGS.n_camels)) as pool:
+    for results in pool.imap_unordered(_play_games, chunks):
+      for coins, game_log, seconds in results:
+        best = max(coins)
+        winners = [i for i, c in enumerate(coins) if c == best]
+        for i in winners:
+          wins[i] += 1 / len(winners)
+        for i, c in enumerate(coins):
+          total_coins[i] += c
+        n_games += 1
+        n_turns += len(game_log['actions'])
+        game_seconds += seconds
+        if log_file:
+          print(json.dumps(game_log), file=log_file)
+  elapsed = time.time() - start_time
+  if log_file:
+    log_file.close()
+
+  print(f'Played {n_games} games ({n_turns} turns) in {elapsed:.1f}s with '
+        f'{n_workers} workers: {n_games / elapsed:.1f} games/s, '
+        f'{n_turns / elapsed:.0f} turns/s, '
+        f'{game_seconds / n_games * 1000:.1f}ms per game per worker.')
+  for i, name in enumerate(FLAGS.policies):
+    low, high = wilson_interval(wins[i], n_games)
+    print(f'Player {i} ({name}): win rate {wins[i] / n_games:.3f} '
+          f'[95% CI {low:.3f}, {high:.3f}], '
+          f'mean coins {total_coins[i] / n_games:.2f}')
+
+
+if __name__ == '__main__':
+  app.run(main)
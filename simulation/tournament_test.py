@@ -0,0 +1,98 @@
+"""Tests for simulation.tournament."""
+
+import random
+import unittest
+
+from parameterized import parameterized
+
+from simulation import board
+from simulation import replay
+from simulation import tournament
+
+
+def make_policies(names, n_spaces, n_camels):
+  return [tournament.POLICIES[name](n_spaces, n_camels) for name in names]
+
+
+class TournamentTest(unittest.TestCase):
+  def test_available_actions(self):
+    b = board.Board(n_spaces=4, n_camels=2, n_players=2)
+    b.apply_move(board.CamelState(1, 2))
+    for _ in board.LEG_BET_VALUES:
+      b.apply_move(board.LegBetState(1, 2))
+    b.apply_move(board.GameBetState(0, 1, True))
+    self.assertEqual(tournament.available_actions(b, 0), [
+        {'player': 0, 'camel': None},
+        {'player': 0, 'leg_bet': 1},
+        {'player': 0, 'game_bet': [2, 'winner']},
+        {'player': 0, 'game_bet': [2, 'loser']},
+    ])
+
+  @parameterized.expand([
+    (['random', 'random'],),
+    (['greedy', 'random'],),
+    (['search', 'greedy', 'random'],),
+  ])
+  def test_play_game(self, names):
+    policies = make_policies(names, n_spaces=6, n_camels=3)
+    coins, game_log = tournament.play_game(policies, 6, 3, seed=1)
+    self.assertEqual(len(coins), len(names))
+    self.assertEqual(
+        (coins, game_log), tournament.play_game(policies, 6, 3, seed=1))
+
+    # The log replays to the same end of game coins.
+    turns = replay.Replayer().replay(game_log)
+    b = board.Board(6, 3, len(names))
+    for turn in turns:
+      if b.round.is_end_of_round():
+        b.round.start_new_round()
+      b.apply_move(replay.parse_action(turn.action, b), turn.player)
+    self.assertTrue(b.tracks.is_end_of_game())
+    self.assertEqual(b.coins, coins)
+
+  def test_dice_only_depend_on_seed(self):
+    def rolls(game_log):
+      return [a['camel'] for a in game_log['actions'] if 'camel' in a]
+
+    random.seed(0)
+    state = random.getstate()
+    _, random_log = tournament.play_game(
+        make_policies(['random', 'random'], 6, 3), 6, 3, seed=2)
+    _, search_log = tournament.play_game(
+        make_policies(['search', 'greedy'], 6, 3), 6, 3, seed=2)
+    self.assertEqual(rolls(random_log), rolls(search_log))
+    # The global RNG is left alone.
+    self.assertEqual(random.getstate(), state)
+
+  def test_greedy_beats_random(self):
+    policies = make_policies(['greedy', 'random'], n_spaces=6, n_camels=3)
+    greedy_coins = 0
+    random_coins = 0
+    for seed in range(20):
+      coins, _ = tournament.play_game(policies, 6, 3, seed)
+      greedy_coins += coins[0]
+      random_coins += coins[1]
+    self.assertGreater(greedy_coins, random_coins)
+
+  def test_greedy_solver_caches_stay_bounded(self):
+    greedy = tournament.GreedyPolicy(
+        6, 3, round_start_cache_size=5, mid_round_cache_size=10)
+    policies = [greedy, tournament.RandomPolicy(6, 3)]
+    for seed in range(20):
+      tournament.play_game(policies, 6, 3, seed)
+    self.assertEqual(len(greedy.solver._round_start_probs_cache), 5)
+    self.assertEqual(len(greedy.solver._round_probs_cache), 10)
+
+  @parameterized.expand([
+    (0, 0, 0.0, 1.0),
+    (50, 100, 0.404, 0.596),
+    (100, 100, 0.963, 1.0),
+  ])
+  def test_wilson_interval(self, wins, n, low, high):
+    interval = tournament.wilson_interval(wins, n)
+    self.assertAlmostEqual(interval[0], low, places=3)
+    self.assertAlmostEqual(interval[1], high, places=3)
+
+
+if __name__ == '__main__':
+  unittest.main()